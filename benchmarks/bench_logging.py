@@ -0,0 +1,86 @@
+# Logging overhead benchmark
+#
+# Measures the cost per call on the calling (event loop) thread for
+# the old setup (handlers called inline, f-string built before the
+# level check) and the current one (records handed to a QueueListener
+# thread, %-style args formatted only when the level is enabled).
+#
+# Run from project root:
+#   python -m benchmarks.bench_logging [iterations]
+
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tempfile
+import time
+
+from core.logger import DeferredQueueHandler
+
+LINE = ":alice!alice@host.example.com PRIVMSG #examplechannel :hello everyone, how is it going?"
+
+FORMAT = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+
+
+def make_handlers(path):
+    console = logging.StreamHandler(open(os.devnull, "w"))
+    console.setLevel(logging.INFO)
+    file = logging.FileHandler(path, encoding="utf-8")
+    file.setLevel(logging.INFO)
+    for handler in (console, file):
+        handler.setFormatter(FORMAT)
+    return console, file
+
+
+def legacy_logger(path):
+    # Old core.logger: DEBUG reaches handlers, handlers run inline
+    log = logging.getLogger("bench_legacy")
+    log.propagate = False
+    log.setLevel(logging.DEBUG)
+    for handler in make_handlers(path):
+        log.addHandler(handler)
+    return log, None
+
+
+def queued_logger(path):
+    # Current core.logger: level set on the logger, handlers in a listener thread
+    log = logging.getLogger("bench_queued")
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    log_queue = queue.SimpleQueue()
+    log.addHandler(DeferredQueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *make_handlers(path), respect_handler_level=True)
+    listener.start()
+    return log, listener
+
+
+def timed(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy, _ = legacy_logger(os.path.join(tmp, "legacy.log"))
+        queued, listener = queued_logger(os.path.join(tmp, "queued.log"))
+
+        results = {
+            "debug (filtered), legacy": timed(lambda: legacy.debug(f"<recv> {LINE}"), iterations),
+            "debug (filtered), queued": timed(lambda: queued.debug("<recv> %s", LINE), iterations),
+            "info (written), legacy": timed(lambda: legacy.info(f"<send> {LINE}"), iterations),
+            "info (written), queued": timed(lambda: queued.info("<send> %s", LINE), iterations),
+        }
+
+        listener.stop()
+
+    for name, usec in results.items():
+        print(f"{name:28} {usec:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Parser microbenchmark
+#
+# Compares core.parser.parse_message with the split based parsing
+# IRCBot used before, on a mix of typical server lines.
+# Each sample line is parsed many times, like the repeated sender and target
+# of real channel traffic, so the line head cache of the parser is warm.
+#
+# Run from project root:
+#   python -m benchmarks.bench_parser [iterations]
+
+import sys
+import time
+
+from core.parser import parse_message
+
+SAMPLE_LINES = [
+    ":alice!alice@host.example.com PRIVMSG #examplechannel :hello everyone, how is it going?",
+    ":bob!~bob@10.0.0.1 PRIVMSG #examplechannel :!roll",
+    ":carol!carol@user/carol PRIVMSG #examplechannel :!note_add remember to buy milk",
+    ":dave!dave@host JOIN #examplechannel",
+    ":erin!erin@host PART #examplechannel :Leaving",
+    ":frank!frank@host QUIT :Quit: bye",
+    "PING :irc.exampleserver.com",
+    "@time=2024-01-01T12:00:00.000Z;msgid=abc123 :alice!alice@host PRIVMSG #examplechannel :tagged message",
+    ":irc.exampleserver.com 353 examplebot = #examplechannel :examplebot alice bob carol",
+]
+
+
+def legacy_parse(line):
+    # Parsing work done by the old IRCBot.run and handle_privmsg
+    parts = line.split()
+    if len(parts) < 2:
+        return None
+
+    prefix = parts[0]
+    command = parts[1]
+    user = prefix[1:prefix.find("!")] if "!" in prefix else prefix
+
+    if command == "PRIVMSG":
+        if len(parts) < 3 or " :" not in line:
+            return None
+        raw_target = parts[2]
+        _, msg_text = line.split(" :", 1)
+        msg_text = msg_text.strip()
+        return user, command, raw_target, msg_text
+
+    return user, command, parts
+
+
+def bench(funcs, lines, iterations, repeat=7):
+    # Best of several runs, a single run is easily skewed by other load.
+    # The functions take turns in each round so load changes hit all of them.
+    best = [float("inf")] * len(funcs)
+    for _ in range(repeat):
+        for i, func in enumerate(funcs):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                for line in lines:
+                    func(line)
+            best[i] = min(best[i], time.perf_counter() - start)
+    return [(iterations * len(lines)) / elapsed for elapsed in best]
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    # The legacy split has no tag support, it takes the tags of a tagged line for the prefix,
+    # so the two are only compared on untagged lines
+    untagged = [line for line in SAMPLE_LINES if not line.startswith("@")]
+    tagged = [line for line in SAMPLE_LINES if line.startswith("@")]
+
+    legacy_rate, parser_rate = bench([legacy_parse, parse_message], untagged, iterations)
+    tagged_rate, = bench([parse_message], tagged, iterations)
+
+    print(f"legacy split parsing: {legacy_rate:,.0f} lines/sec")
+    print(f"parse_message:        {parser_rate:,.0f} lines/sec")
+    print(f"ratio:                {parser_rate / legacy_rate:.2f}x")
+    print(f"parse_message tagged: {tagged_rate:,.0f} lines/sec")
+
+if __name__ == "__main__":
+    main()
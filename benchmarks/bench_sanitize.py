@@ -0,0 +1,63 @@
+# Text sanitizer benchmark
+#
+# Compares utils.text.sanitize_text with the previous two pass
+# generator implementation on realistic chat messages.
+#
+# Run from project root:
+#   python -m benchmarks.bench_sanitize [iterations]
+
+import sys
+import time
+
+from utils.text import sanitize_text
+
+SAMPLE_MESSAGES = [
+    "hello everyone, how is it going?",
+    "!note_add remember to buy milk & eggs tomorrow (before 10am)",
+    "lol that's hilarious 😂😂 did you see the game last night??",
+    "check out https://example.com/some/path?query=1&other=2",
+    "\x02bold\x02 and \x0304colored\x03 text from a fancy client",
+    "Ünïcödé wörds, naïve café résumé — with an em dash",
+    "!roll",
+    "    padded message with trailing spaces     ",
+]
+
+
+def legacy_sanitize_text(text: str) -> str:
+    allowed_symbols = set(" .,!?-_:;@#()[]{}")
+
+    # Remove non-printable characters
+    clean_text = "".join(ch for ch in text if ch.isprintable())
+
+    # Keep only alphanumeric characters and allowed symbols
+    clean_text = "".join(ch for ch in clean_text if ch.isalnum() or ch in allowed_symbols)
+
+    return clean_text.strip()
+
+
+def bench(func, messages, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for message in messages:
+            func(message)
+    elapsed = time.perf_counter() - start
+    return (iterations * len(messages)) / elapsed
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    # Both implementations must agree
+    for message in SAMPLE_MESSAGES:
+        assert sanitize_text(message) == legacy_sanitize_text(message), message
+
+    legacy_rate = bench(legacy_sanitize_text, SAMPLE_MESSAGES, iterations)
+    current_rate = bench(sanitize_text, SAMPLE_MESSAGES, iterations)
+
+    print(f"legacy sanitize_text:  {legacy_rate:,.0f} messages/sec")
+    print(f"current sanitize_text: {current_rate:,.0f} messages/sec")
+    print(f"speedup:               {current_rate / legacy_rate:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
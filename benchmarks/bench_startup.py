@@ -0,0 +1,118 @@
+# Startup time benchmark
+#
+# Measures, each in a fresh interpreter:
+#   interpreter: "python -c pass", the floor nothing in the bot can go below
+#   import:      time to import main (and everything it imports)
+#   join:        process start until the bot's JOIN reaches a local fake IRC server
+#
+# Run from project root:
+#   python -m benchmarks.bench_startup [runs] [--output results.json]
+
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_ircd import FakeIRCServer
+from core.config import ROOT_DIR
+
+IMPORT_CHILD = """
+import time
+started = time.perf_counter()
+import main
+print(time.perf_counter() - started)
+"""
+
+# Same imports as main.py, then one bot against the fake server
+JOIN_CHILD = """
+import asyncio, sys
+from pathlib import Path
+import main
+import utils.chat_logger as chat_logger
+from core.supervisor import BotSupervisor
+
+chat_logger.CHAT_LOG_FILE = Path(sys.argv[2]) / "chat.log"
+supervisor = BotSupervisor([{
+    "name": None, "server": "127.0.0.1", "port": int(sys.argv[1]), "nickname": "startbot",
+    "alt_nickname": None, "channels": ["#startup"], "use_ssl": False,
+    "sasl_username": None, "sasl_password": None,
+}])
+supervisor.build_bots()
+asyncio.run(supervisor.run())
+"""
+
+
+def run_child(code: str, *args) -> str:
+    return subprocess.run(
+        [sys.executable, "-c", code, *args],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+
+
+def time_interpreter() -> float:
+    started = time.perf_counter()
+    run_child("pass")
+    return time.perf_counter() - started
+
+
+def time_import() -> float:
+    return float(run_child(IMPORT_CHILD).strip())
+
+
+async def time_join(tmp: str) -> float:
+    server = FakeIRCServer()
+    port = await server.start()
+
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", JOIN_CHILD, str(port), tmp,
+        cwd=ROOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    try:
+        await asyncio.wait_for(server.joined.wait(), 30)
+        return time.perf_counter() - started
+
+    finally:
+        process.kill()
+        await process.wait()
+        await server.stop()
+
+
+def summary(samples: list[float]) -> dict:
+    return {
+        "runs": len(samples),
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "min_ms": round(min(samples) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IRCBot startup time benchmark")
+    parser.add_argument("runs", type=int, nargs="?", default=10)
+    parser.add_argument("--output", help="write results JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "python": sys.version.split()[0],
+            "interpreter": summary([time_interpreter() for _ in range(args.runs)]),
+            "import": summary([time_import() for _ in range(args.runs)]),
+            "join": summary([asyncio.run(time_join(tmp)) for _ in range(args.runs)]),
+        }
+
+    output = json.dumps(results, indent=4)
+    print(output)
+
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
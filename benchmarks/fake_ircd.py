@@ -0,0 +1,294 @@
+# Minimal fake IRC server for benchmarks and local testing
+#
+# Speaks just enough IRC for IRCBot: NICK/USER registration, 001,
+# JOIN echo, PING/PONG and QUIT. Lines sent by the client are passed
+# to an optional callback with a monotonic timestamp.
+#
+# IRCv3: CAP LS/REQ/END (registration waits for CAP END), SASL PLAIN,
+# server-time tags on lines sent to the client, echo-message and
+# batches via send_batch().
+#
+# Standalone (point a bot at 127.0.0.1:6667 with use_ssl = false):
+#   python -m benchmarks.fake_ircd [--port 6667]
+
+import argparse
+import asyncio
+import base64
+import itertools
+import time
+
+# Capabilities offered in CAP LS
+DEFAULT_CAPS = {
+    "sasl": "PLAIN",
+    "server-time": "",
+    "message-tags": "",
+    "batch": "",
+    "echo-message": "",
+    "cap-notify": "",
+}
+
+
+def _server_time() -> str:
+    now = time.time()
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now)) + f".{int(now % 1 * 1000):03d}Z"
+
+
+class FakeIRCServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, server_name: str = "fake.irc", on_line=None,
+                 caps: dict | None = None, sasl_accounts: dict | None = None):
+        self.host = host
+        self.port = port
+        self.server_name = server_name
+
+        # Offered capabilities (None for the defaults, {} for a server without CAP)
+        # and SASL accounts as {username: password} (None accepts any login)
+        self.caps = DEFAULT_CAPS if caps is None else caps
+        self.sasl_accounts = sasl_accounts
+        self.enabled_caps = set()
+        self.account = None
+        self._cap_negotiating = False
+        self._batch_refs = itertools.count(1)
+
+        # Called as on_line(line, monotonic_time) for every line the client sends
+        self.on_line = on_line
+
+        self.nick = None
+        self.channels = set()
+        self.registered = asyncio.Event()
+        self.joined = asyncio.Event()
+        self.pongs = asyncio.Queue()
+
+        self._server = None
+        self._writer = None
+        self._user_sent = False
+        self._sasl_pending = False
+
+    async def start(self) -> int:
+        # Start listening, returns the bound port
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self) -> None:
+        if self._writer:
+            self._writer.close()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    # Send a raw line to the connected client, tagged with the time if it enabled server-time
+    def send(self, line: str, tags: dict | None = None) -> None:
+        if not self._writer:
+            return
+
+        if "server-time" in self.enabled_caps:
+            tags = {"time": _server_time(), **(tags or {})}
+        if tags:
+            if line.startswith("@"):
+                raw_tags, _, line = line.partition(" ")
+                tags = {**dict(item.partition("=")[::2] for item in raw_tags[1:].split(";")), **tags}
+            line = "@" + ";".join(f"{key}={value}" if value else key for key, value in tags.items()) + " " + line
+
+        self._writer.write(f"{line}\r\n".encode())
+
+    # Send lines as one batch (e.g. "chathistory"), plain lines if the client did not enable batch
+    def send_batch(self, batch_type: str, lines: list[str], params: tuple = ()) -> None:
+        if "batch" not in self.enabled_caps:
+            for line in lines:
+                self.send(line)
+            return
+
+        ref = f"b{next(self._batch_refs)}"
+        self.send(" ".join((f":{self.server_name} BATCH +{ref} {batch_type}", *params)))
+        for line in lines:
+            self.send(line, {"batch": ref})
+        self.send(f":{self.server_name} BATCH -{ref}")
+
+    async def drain(self) -> None:
+        if self._writer:
+            await self._writer.drain()
+
+    # Send PING and wait for the matching PONG, all earlier lines have been read by then
+    async def ping(self, token: str, timeout: float = 30.0) -> float:
+        self.send(f"PING :{token}")
+        await self.drain()
+        while True:
+            reply, received_at = await asyncio.wait_for(self.pongs.get(), timeout)
+            if reply == token:
+                return received_at
+
+    def _welcome(self) -> None:
+        self.send(f":{self.server_name} 001 {self.nick} :Welcome to the fake IRC network {self.nick}")
+        self.send(f":{self.server_name} 376 {self.nick} :End of /MOTD command.")
+        self.registered.set()
+
+    def _try_register(self) -> None:
+        # Registration completes once NICK and USER are in and CAP negotiation ended
+        if self.nick and self._user_sent and not self._cap_negotiating and not self.registered.is_set():
+            self._welcome()
+
+    def _handle_cap(self, rest: str) -> None:
+        subcommand, _, args = rest.partition(" ")
+        subcommand = subcommand.upper()
+        target = self.nick or "*"
+
+        if not self.caps:
+            self.send(f":{self.server_name} 421 {target} CAP :Unknown command")
+            return
+
+        if subcommand == "LS":
+            self._cap_negotiating = not self.registered.is_set()
+            offered = " ".join(f"{name}={value}" if value else name for name, value in self.caps.items())
+            self.send(f":{self.server_name} CAP {target} LS :{offered}")
+
+        elif subcommand == "REQ":
+            self._cap_negotiating = not self.registered.is_set()
+            requested = args.lstrip(":").split()
+            # All or nothing
+            if all(name.lstrip("-") in self.caps for name in requested):
+                for name in requested:
+                    if name.startswith("-"):
+                        self.enabled_caps.discard(name[1:])
+                    else:
+                        self.enabled_caps.add(name)
+                self.send(f":{self.server_name} CAP {target} ACK :{' '.join(requested)}")
+            else:
+                self.send(f":{self.server_name} CAP {target} NAK :{' '.join(requested)}")
+
+        elif subcommand == "END":
+            self._cap_negotiating = False
+            self._try_register()
+
+    def _handle_authenticate(self, rest: str) -> None:
+        target = self.nick or "*"
+        if "sasl" not in self.enabled_caps:
+            return
+
+        if rest.upper() == "PLAIN":
+            self._sasl_pending = True
+            self.send("AUTHENTICATE +")
+            return
+
+        if not self._sasl_pending:
+            return
+        self._sasl_pending = False
+
+        try:
+            _, username, password = base64.b64decode(rest).decode().split("\0")
+        except ValueError:
+            self.send(f":{self.server_name} 904 {target} :SASL authentication failed")
+            return
+
+        if self.sasl_accounts is not None and self.sasl_accounts.get(username) != password:
+            self.send(f":{self.server_name} 904 {target} :SASL authentication failed")
+            return
+
+        self.account = username
+        self.send(f":{self.server_name} 900 {target} {target}!bot@fake.host {username} :You are now logged in as {username}")
+        self.send(f":{self.server_name} 903 {target} :SASL authentication successful")
+
+    def _handle_command(self, line: str) -> None:
+        # Client tags (message-tags) are not used by the fake server
+        if line.startswith("@"):
+            line = line.partition(" ")[2]
+
+        command, _, rest = line.partition(" ")
+        command = command.upper()
+
+        if command == "CAP":
+            self._handle_cap(rest)
+
+        elif command == "AUTHENTICATE":
+            self._handle_authenticate(rest)
+
+        elif command == "NICK":
+            self.nick = rest.lstrip(":").strip()
+            self._try_register()
+
+        elif command == "USER":
+            self._user_sent = True
+            self._try_register()
+
+        elif command == "PRIVMSG":
+            if "echo-message" in self.enabled_caps:
+                self.send(f":{self.nick}!bot@fake.host {line}")
+
+        elif command == "PING":
+            self.send(f":{self.server_name} PONG {self.server_name} :{rest.lstrip(':')}")
+
+        elif command == "PONG":
+            token = rest.rpartition(":")[2] if ":" in rest else rest
+            self.pongs.put_nowait((token.strip(), time.monotonic()))
+
+        elif command == "JOIN":
+            for channel in rest.lstrip(":").split(" ")[0].split(","):
+                self.channels.add(channel)
+                self.send(f":{self.nick}!bot@fake.host JOIN {channel}")
+            self.joined.set()
+
+        elif command == "PART":
+            for channel in rest.split(" ")[0].split(","):
+                self.channels.discard(channel)
+
+        elif command == "QUIT":
+            if self._writer:
+                self._writer.close()
+
+    async def _handle_client(self, reader, writer):
+        # One client at a time, a new connection replaces the old one
+        self._writer = writer
+        self._user_sent = False
+        self._sasl_pending = False
+        self._cap_negotiating = False
+        self.enabled_caps = set()
+        self.account = None
+        self.registered.clear()
+        self.joined.clear()
+
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+
+                received_at = time.monotonic()
+                line = raw.decode("utf-8", errors="ignore").rstrip("\r\n")
+                if not line:
+                    continue
+
+                self._handle_command(line)
+                if self.on_line:
+                    self.on_line(line, received_at)
+
+                await writer.drain()
+
+        except ConnectionError:
+            pass
+
+        finally:
+            if self._writer is writer:
+                self._writer = None
+            writer.close()
+
+
+async def _serve(host: str, port: int) -> None:
+    server = FakeIRCServer(host, port, on_line=lambda line, _: print(f"<client> {line}"))
+    port = await server.start()
+    print(f"Fake IRC server listening on {host}:{port}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake IRC server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6667)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(_serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
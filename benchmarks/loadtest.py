@@ -0,0 +1,313 @@
+# End-to-end load benchmark
+#
+# Runs IRCBot in-process against benchmarks.fake_ircd, floods it with a
+# configurable mix of chat lines, commands and JOIN/PART events, and
+# reports inbound messages/sec and command-to-reply latency percentiles.
+# Notes and the chat log are written to a temporary directory.
+#
+# Run from project root:
+#   python -m benchmarks.loadtest --messages 20000 --output results.json
+#   python -m benchmarks.loadtest --mix chat=50,roll=20,note_add=10,note_read=5,funfact=15
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.fake_ircd import FakeIRCServer
+from core.bot import IRCBot
+from core.config import ROOT_DIR, get_settings, is_command_enabled
+from core.logger import console_handler
+from utils.rate_limit import TokenBucket
+import commands.note as note_module
+import utils.chat_logger as chat_logger
+
+DEFAULT_MIX = "chat=60,roll=10,note_add=8,note_read=2,funfact=8,join=6,part=6"
+COMMAND_KINDS = ("roll", "note_add", "note_read", "funfact")
+EVENT_KINDS = ("chat", "join", "part")
+
+CHAT_LINES = [
+    "hello everyone, how is it going?",
+    "did anyone see the game last night",
+    "brb, coffee",
+    "check out https://example.com/some/path?query=1",
+    "lol",
+]
+
+
+class _Pending:
+    # A command waiting for its reply lines
+    __slots__ = ("kind", "sent_at", "remaining", "first_at")
+
+    def __init__(self, kind, sent_at, remaining):
+        self.kind = kind
+        self.sent_at = sent_at
+        self.remaining = remaining
+        self.first_at = None
+
+
+class ReplyTracker:
+    """
+    Match bot replies to commands.
+    Replies to one target are sent in command order, and the number of
+    lines each command produces is known up front, so a FIFO per channel is enough.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.pending_count = 0
+        self.reply_lines = 0
+        self.first_reply = {kind: [] for kind in COMMAND_KINDS}
+        self.last_reply = {kind: [] for kind in COMMAND_KINDS}
+        self.done = asyncio.Event()
+        self.done.set()
+
+    def expect(self, channel, kind, sent_at, lines):
+        self.pending.setdefault(channel, deque()).append(_Pending(kind, sent_at, lines))
+        self.pending_count += 1
+        self.done.clear()
+
+    def on_line(self, line, received_at):
+        if not line.startswith("PRIVMSG "):
+            return
+
+        self.reply_lines += 1
+        channel = line.split(" ", 2)[1]
+        queue = self.pending.get(channel)
+        if not queue:
+            return
+
+        head = queue[0]
+        if head.first_at is None:
+            head.first_at = received_at
+            self.first_reply[head.kind].append(received_at - head.sent_at)
+
+        head.remaining -= 1
+        if head.remaining <= 0:
+            queue.popleft()
+            self.last_reply[head.kind].append(received_at - head.sent_at)
+            self.pending_count -= 1
+            if not self.pending_count:
+                self.done.set()
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for item in text.split(","):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in COMMAND_KINDS + EVENT_KINDS:
+            raise ValueError(f"Unknown message kind in mix: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+
+    ordered = sorted(samples)
+
+    def pick(p):
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "p50": pick(50),
+        "p95": pick(95),
+        "p99": pick(99),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def generate_load(server, tracker, args, channels):
+    mix = parse_mix(args.mix)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    rng = random.Random(args.seed)
+    settings = get_settings()
+    max_notes = settings.max_notes
+
+    # Notes per channel, decides how many lines note_read answers with
+    note_counts = dict.fromkeys(channels, 0)
+
+    interval = 1 / args.rate if args.rate > 0 else 0
+    start = time.monotonic()
+
+    for i in range(args.messages):
+        kind = rng.choices(kinds, weights)[0]
+        channel = rng.choice(channels)
+        nick = f"user{rng.randrange(args.users)}"
+        prefix = f":{nick}!{nick}@load.test"
+
+        if kind == "chat":
+            server.send(f"{prefix} PRIVMSG {channel} :{rng.choice(CHAT_LINES)}")
+
+        elif kind == "join":
+            server.send(f"{prefix} JOIN {channel}")
+
+        elif kind == "part":
+            server.send(f"{prefix} PART {channel} :bye")
+
+        else:
+            lines = 1
+            if kind == "note_add":
+                server.send(f"{prefix} PRIVMSG {channel} :!note_add load test note {i}")
+                if is_command_enabled(kind) and note_counts[channel] < max_notes:
+                    note_counts[channel] += 1
+
+            elif kind == "note_read":
+                server.send(f"{prefix} PRIVMSG {channel} :!note_read")
+                if is_command_enabled(kind):
+                    # Page header plus the first page, or a single "Notes empty!"
+                    count = min(note_counts[channel], settings.note_page_size)
+                    lines = count + 1 if count else 1
+
+            else:
+                server.send(f"{prefix} PRIVMSG {channel} :!{kind}")
+
+            tracker.expect(channel, kind, time.monotonic(), lines)
+
+        if i % 100 == 99:
+            await server.drain()
+
+        # Pace to the requested rate
+        if interval:
+            delay = start + (i + 1) * interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    await server.drain()
+    return start
+
+
+async def run_load(args) -> dict:
+    channels = [f"#load{i}" for i in range(args.channels)]
+    tracker = ReplyTracker()
+    server = FakeIRCServer(on_line=tracker.on_line)
+    port = await server.start()
+
+    bot = IRCBot("127.0.0.1", port, "loadbot", channels, False)
+
+    # Flood pacing off unless asked for, this measures the bot and not the pacing
+    bot.send_bucket = TokenBucket(args.send_rate, args.send_burst) if args.send_rate > 0 else None
+    bot.max_queue_lines = max(bot.max_queue_lines, args.messages * 2)
+
+    # Rate limiting drops commands, reply matching needs every command answered
+    bot.rate_limiter.enabled = False
+
+    # Reply matching counts lines per command, keep one line per reply
+    bot.merge_replies = False
+
+    bot_task = asyncio.create_task(bot.run())
+    await asyncio.wait_for(server.joined.wait(), 10)
+
+    start = await generate_load(server, tracker, args, channels)
+
+    # PONG arrives once the read loop has handled every line before the PING
+    handled_at = await server.ping("loadtest-done", timeout=args.drain_timeout)
+    inbound_seconds = handled_at - start
+
+    try:
+        await asyncio.wait_for(tracker.done.wait(), args.drain_timeout)
+    except asyncio.TimeoutError:
+        pass
+    finished_at = time.monotonic()
+
+    bot_task.cancel()
+    try:
+        await bot_task
+    except asyncio.CancelledError:
+        pass
+    await chat_logger.stop_chat_logger()
+    await server.stop()
+
+    all_first = [sample for samples in tracker.first_reply.values() for sample in samples]
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "params": {
+            "messages": args.messages,
+            "mix": args.mix,
+            "channels": args.channels,
+            "users": args.users,
+            "rate": args.rate,
+            "send_rate": args.send_rate,
+            "seed": args.seed,
+        },
+        "inbound": {
+            "messages": args.messages,
+            "seconds": round(inbound_seconds, 4),
+            "messages_per_sec": round(args.messages / inbound_seconds, 1),
+        },
+        "replies": {
+            "lines": tracker.reply_lines,
+            "seconds": round(finished_at - start, 4),
+            "unanswered_commands": tracker.pending_count,
+        },
+        "latency_ms": {
+            "first_reply": {
+                "all": percentiles(all_first),
+                **{kind: percentiles(samples) for kind, samples in tracker.first_reply.items()},
+            },
+            "last_reply": {
+                kind: percentiles(samples) for kind, samples in tracker.last_reply.items()
+            },
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IRCBot end-to-end load benchmark")
+    parser.add_argument("--messages", type=int, default=10000, help="inbound lines to send")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weights per kind, e.g. chat=60,roll=10")
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=0, help="inbound lines/sec, 0 = as fast as possible")
+    parser.add_argument("--send-rate", type=float, default=0, help="bot send pacing in lines/sec, 0 = off")
+    parser.add_argument("--send-burst", type=int, default=5)
+    parser.add_argument("--drain-timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results JSON to this file")
+    args = parser.parse_args()
+
+    # Keep the console readable, the log file still gets everything
+    console_handler.setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep benchmark notes and chat log out of data/ and logs/
+        note_module.note_store.note_dir = Path(tmp)
+        chat_logger.CHAT_LOG_FILE = Path(tmp) / "chat.log"
+
+        results = asyncio.run(run_load(args))
+
+    output = json.dumps(results, indent=4)
+    print(output)
+
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
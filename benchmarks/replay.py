@@ -0,0 +1,185 @@
+# Replay a traffic recording through the bot
+#
+# Feeds a recording made with [recording] enabled = true (core/recorder.py)
+# through IRCBot's real read loop, parser and command dispatch. The server
+# side is a stub writer that only counts what the bot sends, notes and the
+# chat log are written to a temporary directory.
+#
+# Run from project root:
+#   python -m benchmarks.replay logs/recordings/default-20250101-120000.rec.gz
+#   python -m benchmarks.replay recording.rec.gz --speed 1      # original timing
+#   python -m benchmarks.replay recording.rec.gz --profile      # reports to logs/profiles
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.loadtest import git_commit
+from core.bot import IRCBot
+from core.config import get_settings
+from core.logger import console_handler
+from core.metrics import metrics
+from core.process_pool import start_command_pool, stop_command_pool
+from core.profiler import profiler
+from core.recorder import read_recording
+from commands.registry import COMMANDS
+import commands.note as note_module
+import utils.chat_logger as chat_logger
+
+
+class StubWriter:
+    # Stands in for the server connection, counts what the bot sends
+    def __init__(self):
+        self.lines = 0
+        self.bytes = 0
+
+    def write(self, data: bytes) -> None:
+        self.lines += data.count(b"\r\n")
+        self.bytes += len(data)
+
+    async def drain(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    async def wait_closed(self) -> None:
+        pass
+
+
+async def feed(reader, records, speed: float) -> None:
+    # speed 0 feeds everything at once, otherwise the recorded gaps are divided by speed
+    if speed <= 0:
+        reader.feed_data("".join(f"{line}\r\n" for _, line in records).encode())
+        reader.feed_eof()
+        return
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    offset = 0.0
+    for delta, line in records:
+        offset += delta / speed
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        reader.feed_data(f"{line}\r\n".encode())
+    reader.feed_eof()
+
+
+async def wait_idle(bot, timeout: float) -> None:
+    # Until every command finished and the send queue is empty
+    deadline = time.monotonic() + timeout
+    while (bot.dispatcher.pending or bot.queue_depth) and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+async def replay(args) -> dict:
+    header, records = read_recording(args.recording)
+
+    bot = IRCBot("replay.invalid", 0, header["nick"], header["channels"], False, name="replay")
+    bot.send_bucket = None
+    if args.no_rate_limit:
+        bot.rate_limiter.enabled = False
+
+    writer = StubWriter()
+    bot.reader = asyncio.StreamReader()
+    bot.writer = writer
+    bot._writer_task = asyncio.create_task(bot._writer_loop())
+
+    # Same worker processes as the real bot, started before timing
+    await start_command_pool(COMMANDS, get_settings().enabled_commands)
+
+    if args.profile:
+        profiler.start()
+
+    started = time.perf_counter()
+    feeder = asyncio.create_task(feed(bot.reader, records, args.speed))
+    await bot._read_loop()
+    read_seconds = time.perf_counter() - started
+
+    await wait_idle(bot, args.drain_timeout)
+    total_seconds = time.perf_counter() - started
+    await feeder
+
+    reports = await profiler.stop() if args.profile else []
+
+    await bot.dispatcher.shutdown()
+    await bot._stop_writer()
+    await stop_command_pool()
+    await chat_logger.stop_chat_logger()
+
+    duration = metrics.histograms
+    command_latency = {
+        dict(labels)["command"]: {
+            "count": histogram.count,
+            "p50_ms": histogram.quantile(0.5) * 1000,
+            "p95_ms": histogram.quantile(0.95) * 1000,
+        }
+        for (name, labels), histogram in sorted(duration.items())
+        if name == "bot_command_duration_seconds"
+    }
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "recording": {
+            "file": str(args.recording),
+            "started": header.get("started"),
+            "lines": len(records),
+            "recorded_seconds": round(sum(delta for delta, _ in records), 3),
+        },
+        "params": {"speed": args.speed, "rate_limit": not args.no_rate_limit},
+        "inbound": {
+            "seconds": round(read_seconds, 4),
+            "lines_per_sec": round(len(records) / read_seconds, 1) if read_seconds else None,
+        },
+        "total_seconds": round(total_seconds, 4),
+        "commands": {
+            "executed": int(metrics.counter_total("bot_command_calls_total")),
+            "errors": int(metrics.counter_total("bot_command_errors_total")),
+            "timeouts": int(metrics.counter_total("bot_command_timeouts_total")),
+            "rate_limited": int(metrics.counter_total("bot_commands_limited_total")),
+            "unfinished": bot.dispatcher.pending,
+            "latency": command_latency,
+        },
+        "outbound": {"lines": writer.lines, "bytes": writer.bytes},
+        "profile_reports": [str(path) for path in reports],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded IRC traffic through the bot")
+    parser.add_argument("recording", type=Path)
+    parser.add_argument("--speed", type=float, default=0, help="1 = recorded timing, 2 = twice as fast, 0 = as fast as possible")
+    parser.add_argument("--no-rate-limit", action="store_true", help="run every command, even ones that were rate limited")
+    parser.add_argument("--profile", action="store_true", help="profile the replay, reports go to logs/profiles")
+    parser.add_argument("--drain-timeout", type=float, default=60)
+    parser.add_argument("--output", help="write results JSON to this file")
+    args = parser.parse_args()
+
+    # Keep the console readable, the log file still gets everything
+    console_handler.setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep replayed notes and chat log out of data/ and logs/
+        note_module.note_store.note_dir = Path(tmp)
+        chat_logger.CHAT_LOG_FILE = Path(tmp) / "chat.log"
+
+        results = asyncio.run(replay(args))
+
+    output = json.dumps(results, indent=4)
+    print(output)
+
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
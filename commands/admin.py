@@ -0,0 +1,18 @@
+from core.config import reload_config
+from core.logger import log_info, log_error
+
+async def reload_command(bot, user, target, tokens=None):
+    try:
+        settings = reload_config()
+    
+    except Exception as e:
+        # Keep running on the old settings
+        log_error("Config reload failed: ", exc=e)
+        await bot.send_privmsg(target=target, message=f"Config reload failed: {e}")
+        return
+    
+    log_info(f"Config reloaded by {user}")
+    await bot.send_privmsg(
+        target=target,
+        message=f"Config reloaded, {len(settings.enabled_commands)} commands enabled"
+    )
@@ -0,0 +1,71 @@
+# Dice expressions like "3d6+2" or "4d6k3" (keep the 3 highest)
+# Runs in the command process pool (cpu_bound in the registry), so it is a
+# plain function returning the reply instead of sending it.
+
+import random
+import re
+
+# Dice in the whole expression, keeps a roll far below the command timeout
+MAX_DICE = 10_000
+MAX_SIDES = 1_000_000
+MAX_TERMS = 20
+SHOWN_ROLLS = 10
+
+TERM_RE = re.compile(r"([+-])?(?:(\d*)d(\d+)(?:k(\d+))?|(\d+))")
+
+
+def _roll_term(count: int, sides: int, keep: int | None) -> tuple[int, list[int]]:
+    rolls = [random.randint(1, sides) for _ in range(count)]
+    if keep is not None and keep < count:
+        rolls = sorted(rolls, reverse=True)[:keep]
+    return sum(rolls), rolls
+
+
+def dice_roll(user: str, tokens: list[str]) -> str:
+    # "2d6 + 3" and "2d6+3" are the same, other spaces are invalid
+    expression = re.sub(r"\s*([+-])\s*", r"\1", " ".join(tokens[1:]).lower())
+    if not expression:
+        return "Usage: dice <NdM[kK]+...>, e.g. 3d6+2 or 4d6k3"
+
+    total = 0
+    shown = []
+    pos = 0
+    terms = 0
+    dice = 0
+
+    while pos < len(expression):
+        match = TERM_RE.match(expression, pos)
+        if not match or match.end() == pos or (pos and not match.group(1)):
+            return f"Invalid dice expression: {expression}"
+
+        terms += 1
+        if terms > MAX_TERMS:
+            return f"Too many terms, at most {MAX_TERMS}"
+
+        sign, count, sides, keep, constant = match.groups()
+        factor = -1 if sign == "-" else 1
+
+        if constant is not None:
+            total += factor * int(constant)
+
+        else:
+            count = int(count) if count else 1
+            sides = int(sides)
+            if count < 1 or not 1 <= sides <= MAX_SIDES:
+                return f"Use at least 1 die with 1 to {MAX_SIDES} sides"
+
+            dice += count
+            if dice > MAX_DICE:
+                return f"Too many dice, at most {MAX_DICE} in total"
+
+            value, rolls = _roll_term(count, sides, int(keep) if keep else None)
+            total += factor * value
+            shown.extend(rolls[:SHOWN_ROLLS - len(shown)])
+
+        pos = match.end()
+
+    details = ", ".join(map(str, shown))
+    if len(shown) >= SHOWN_ROLLS:
+        details += ", ..."
+    # The expression itself is not echoed, the sanitizer would strip "+" and "="
+    return f"{user} rolled {total}" + (f" ({details})" if details else "")
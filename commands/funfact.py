@@ -1,16 +1,25 @@
 from pathlib import Path
-from core.storage import read_json
+from core.resources import get_resource
 from random import choice
 
 RESOURCES_DIR = Path(__file__).parent / "resources" / "funfact"
 FACTS_FILE = RESOURCES_DIR / "facts.json"
 
+def build_facts(all_facts):
+    # Precompute category list and per-category tuples for O(1) random picks
+    categories = {
+        name: tuple(facts)
+        for name, facts in (all_facts or {}).items()
+        if facts
+    }
+    return tuple(categories), categories
+
 async def funfact_command(bot, user, target, tokens=None):
-    all_facts = await read_json(FACTS_FILE)
+    category_names, categories = await get_resource(FACTS_FILE, build_facts)
     arg = tokens[1] if tokens and len(tokens) > 1 else None
 
     if arg:
-        if arg not in all_facts:
+        if arg not in categories:
             await bot.send_privmsg(
                 target=target,
                 message=f"Unknown category: {arg}"
@@ -18,11 +27,15 @@ async def funfact_command(bot, user, target, tokens=None):
             return
 
         category_name = arg
-        random_fact = choice(all_facts[arg])
+        random_fact = choice(categories[arg])
 
     else:
-        category_name = choice(list(all_facts.keys()))
-        random_fact = choice(all_facts[category_name])
+        if not category_names:
+            await bot.send_privmsg(target=target, message="No facts available")
+            return
+
+        category_name = choice(category_names)
+        random_fact = choice(categories[category_name])
 
     await bot.send_privmsg(
         target=target,
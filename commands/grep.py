@@ -0,0 +1,53 @@
+from core.config import config, get_settings
+from utils.chat_logger import chat_grep, ChatLogUnavailable
+
+async def grep_command(bot, user, target, tokens=None):
+    logging_cfg = config.get("logging", {})
+    max_results = int(logging_cfg.get("chat_grep_max_results", 5))
+    
+    args = tokens[1:] if tokens else []
+    
+    # Trailing number is the result count, e.g. "grep hello world 3"
+    limit = 3
+    if len(args) > 1 and args[-1].isdecimal():
+        limit = int(args[-1])
+        args = args[:-1]
+    limit = max(1, min(limit, max_results))
+    
+    term = " ".join(args)
+    if not term:
+        await bot.send_privmsg(target=target, message="Usage: grep <text> [count]")
+        return
+    
+    # Channels only search their own history, a PM has no channel to search
+    if not target.startswith("#"):
+        await bot.send_privmsg(target=target, message="grep only works in a channel")
+        return
+    
+    if not get_settings().chat_log_enabled:
+        await bot.send_privmsg(target=target, message="Chat log is not available")
+        return
+    
+    try:
+        results = await chat_grep(
+            term,
+            limit,
+            network=bot.name,
+            location=target,
+            skip_users=[bot.nick],
+            skip_prefix=bot.cmd_prefix,
+            max_bytes=int(logging_cfg.get("chat_grep_max_bytes", 16 * 1024 * 1024)),
+        )
+    except ChatLogUnavailable:
+        await bot.send_privmsg(target=target, message="Chat log is not available")
+        return
+    
+    if not results:
+        await bot.send_privmsg(target=target, message=f"No messages found for: {term}")
+        return
+    
+    lines = [
+        f"{timestamp} UTC, {location}, {nick}: {message}"
+        for timestamp, location, nick, message in results
+    ]
+    await bot.send_privmsgs(target=target, messages=lines)
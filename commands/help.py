@@ -1,8 +1,9 @@
-from core.config import enabled_commands
+from core.config import get_settings
 
 async def help_command(bot, user, target, tokens=None):
     from commands.registry import COMMANDS
 
+    enabled_commands = get_settings().enabled_commands
     arg = tokens[1] if tokens and len(tokens) > 1 else None
     
     # Case: !help <command>
@@ -23,7 +24,7 @@ async def help_command(bot, user, target, tokens=None):
         commands = []
 
         for cmd_name in sorted(enabled_commands):
-            if cmd_name in COMMANDS:
+            if cmd_name in COMMANDS and not COMMANDS[cmd_name].get("admin"):
                 commands.append(f"{bot.cmd_prefix}{cmd_name}")
 
         if not commands:
@@ -31,11 +32,10 @@ async def help_command(bot, user, target, tokens=None):
             await bot.send_privmsg(target=target, message=message)
             
         else:
-            message = f"Available commands: {', '.join(commands)}"
-        
-            await bot.send_privmsg(target=target, message=message)
-            
-            await bot.send_privmsg(
+            await bot.send_privmsgs(
                 target=target,
-                message=f"Use {bot.cmd_prefix}help [command] for more info on a specific command."
+                messages=[
+                    f"Available commands: {', '.join(commands)}",
+                    f"Use {bot.cmd_prefix}help [command] for more info on a specific command."
+                ]
             )
@@ -1,20 +1,22 @@
 from pathlib import Path
-from core.storage import read_json
+from core.resources import get_resource
 from random import choice
 
 RESOURCES_DIR = Path(__file__).parent / "resources" / "joke"
 JOKES_FILE = RESOURCES_DIR / "jokes.json"
 
+def build_jokes(all_jokes):
+    # Format once when the file is loaded
+    return tuple(joke.capitalize() for joke in all_jokes or [])
+
 async def joke_command(bot, user, target, tokens=None):
-    all_jokes = await read_json(JOKES_FILE)
+    all_jokes = await get_resource(JOKES_FILE, build_jokes)
     
     if not all_jokes:
         await bot.send_privmsg(target=target, message="No jokes available")
         return
     
-    random_joke = choice(all_jokes)
-    
     await bot.send_privmsg(
         target=target,
-        message=random_joke.capitalize()
+        message=choice(all_jokes)
     )
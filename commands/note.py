@@ -1,39 +1,84 @@
 from datetime import datetime, timezone
 
-from core.storage import read_json, write_json, wipe_json
-from core.config import config, DATA_DIR
+from core.note_store import NoteStore
+from core.config import config, get_settings, DATA_DIR
 from utils.text import sanitize_text, truncate_text, sanitize_filename
 
 NOTE_DIR = DATA_DIR / "note"
-NOTE_DIR.mkdir(parents=True, exist_ok = True)
+
+note_store = NoteStore(
+    NOTE_DIR,
+    compact_threshold=config["notes"].get("compact_threshold", 100)
+)
+
+def _split_page(args: list[str], min_args: int = 1) -> tuple[list[str], int]:
+    # Trailing number is the page, e.g. "note_search foo bar 2"
+    if len(args) > min_args and args[-1].isdecimal():
+        return args[:-1], max(1, int(args[-1]))
+    return args, 1
+
+
+async def _send_page(bot, target, notes, total, page, page_size, empty_message):
+    if not notes:
+        message = empty_message if not total else f"No page {page}, there are {-(-total // page_size)} pages"
+        await bot.send_privmsg(target=target, message=message)
+        return
+
+    pages = -(-total // page_size)
+    lines = [f"Page {page} of {pages}, {total} notes"]
+    lines.extend(f"{note['timestamp']}, {note['user']}, {note['content']}" for note in notes)
+    await bot.send_privmsgs(target=target, messages=lines)
+
 
 async def note_command(bot, user, target, tokens):
     if not tokens:
         return
     
     note_mode = tokens[0]
+    settings = get_settings()
     
     note_filename = sanitize_text(target).strip().lower()
     note_filename = sanitize_filename(note_filename)
     note_filename = f"channel_{note_filename}" if target.startswith("#") else f"private_{note_filename}"
-    note_file = NOTE_DIR / f"{note_filename}.json"
+
+    # Same named channels and nicks on other [[networks]] are not the same, one directory per network
+    network = sanitize_filename(bot.name or "")
+    if network:
+        note_filename = f"{network}/{note_filename}"
+
+    page_size = settings.note_page_size
 
     if note_mode == "note_read":
-        notes = await read_json(note_file)
+        _, page = _split_page(tokens[1:], min_args=0)
+        notes, total = await note_store.read_page(note_filename, page, page_size)
+        await _send_page(bot, target, notes, total, page, page_size, "Notes empty!")
+
+    elif note_mode == "note_search":
+        terms, page = _split_page(tokens[1:])
+        if not terms:
+            await bot.send_privmsg(
+                target=target,
+                message="Usage: note_search <words> [page]"
+            )
+            return
+
+        notes, total = await note_store.search(note_filename, terms, page, page_size)
+        await _send_page(bot, target, notes, total, page, page_size, "No matching notes")
 
-        if not notes:
+    elif note_mode == "note_from":
+        args, page = _split_page(tokens[1:])
+        if len(args) != 1:
             await bot.send_privmsg(
                 target=target,
-                message="Notes empty!"
+                message="Usage: note_from <user> [page]"
             )
             return
 
-        for note in notes:
-            line = f"{note['timestamp']}, {note['user']}, {note['content']}"
-            await bot.send_privmsg(target=target, message=line)
+        notes, total = await note_store.by_author(note_filename, args[0], page, page_size)
+        await _send_page(bot, target, notes, total, page, page_size, f"No notes from {args[0]}")
 
     elif note_mode == "note_wipe":
-        await wipe_json(note_file)
+        await note_store.wipe(note_filename)
         await bot.send_privmsg(
             target=target,
             message=f"Notes wiped by {user}"
@@ -47,10 +92,9 @@ async def note_command(bot, user, target, tokens):
             )
             return
 
-        notes = await read_json(note_file)
-        max_notes = config["notes"].get("max_notes", 50)
+        max_notes = settings.max_notes
 
-        if len(notes) >= max_notes:
+        if await note_store.count(note_filename) >= max_notes:
             await bot.send_privmsg(
                 target=target,
                 message=f"Cannot add note, max notes ({max_notes}) reached!"
@@ -61,7 +105,7 @@ async def note_command(bot, user, target, tokens):
         clean_text = sanitize_text(raw_text)
         clean_text = truncate_text(
             clean_text,
-            config["notes"].get("max_note_length", 200)
+            settings.max_note_length
         )
 
         if not clean_text:
@@ -79,8 +123,13 @@ async def note_command(bot, user, target, tokens):
             "content": clean_text
         }
 
-        notes.append(note)
-        await write_json(note_file, notes)
+        # Limit is checked again under the store lock in case of concurrent adds
+        if not await note_store.add(note_filename, note, max_notes):
+            await bot.send_privmsg(
+                target=target,
+                message=f"Cannot add note, max notes ({max_notes}) reached!"
+            )
+            return
 
         await bot.send_privmsg(
             target=target,
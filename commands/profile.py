@@ -0,0 +1,25 @@
+from core.logger import log_info
+from core.profiler import profiler
+
+async def profile_command(bot, user, target, tokens=None):
+    action = tokens[1].lower() if tokens and len(tokens) > 1 else "status"
+    
+    if action == "start":
+        if profiler.start():
+            log_info(f"Profiling started by {user}")
+            message = "Profiling started, use profile stop to write the reports"
+        else:
+            message = profiler.status()
+    
+    elif action == "stop":
+        files = await profiler.stop()
+        # No path in the message, the sanitizer strips "/"
+        message = f"Profiling stopped, wrote {', '.join(f.name for f in files)}" if files else "Profiling is off"
+    
+    elif action == "status":
+        message = profiler.status()
+    
+    else:
+        message = "Usage: profile [start, stop, status]"
+    
+    await bot.send_privmsg(target=target, message=message)
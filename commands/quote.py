@@ -1,21 +1,25 @@
 from pathlib import Path
-from core.storage import read_json
+from core.resources import get_resource
 import random
 
 RESOURCES_DIR = Path(__file__).parent / "resources" / "quote"
 QUOTES_FILE = RESOURCES_DIR / "quotes.json"
 
+def build_quotes(all_quotes):
+    # Format once when the file is loaded
+    return tuple(
+        f"{quote['quote'].capitalize()} - {quote['from'].title()}"
+        for quote in all_quotes or []
+    )
+
 async def quote_command(bot, user, target, tokens=None):
-    all_quotes = await read_json(QUOTES_FILE)
+    all_quotes = await get_resource(QUOTES_FILE, build_quotes)
     
     if not all_quotes:
         await bot.send_privmsg(target=target, message="No quotes available.")
         return
 
-    random_quote = random.choice(all_quotes)
-    result = f"{random_quote['quote'].capitalize()} - {random_quote['from'].title()}"
-
     await bot.send_privmsg(
         target=target,
-        message=result
+        message=random.choice(all_quotes)
     )
@@ -1,56 +1,138 @@
-# import all bot commands
-from commands.help import help_command
-from commands.note import note_command
-from commands.roll import roll_command
-from commands.funfact import funfact_command
-from commands.quote import quote_command
-from commands.flip import flip_command
-from commands.joke import joke_command
+# Command registry
+# Entries only hold metadata, a command module is imported the first time
+# the command runs, so disabled commands are never imported at all.
+import importlib
 
+# Required entry keys:
+#   "module" / "handler": module path and name of the async function running the command
+# Optional entry keys:
+#   "timeout": seconds before the command is cancelled (overrides [dispatch] command_timeout)
+#   "admin": only users matching [bot] admins may run the command
+#   "cost": rate limit tokens the command uses (default 1), higher for commands that reply with many lines
+#   "cpu_bound": run in the command process pool, the handler is then a plain function
+#                called as handler(user, tokens) that returns the reply message(s)
 COMMANDS = {
     "help": {
-        "func": help_command,
+        "module": "commands.help",
+        "handler": "help_command",
         "description": "Shows available commands",
-        "usage": "help"
+        "usage": "help",
+        "cost": 2
     },
     "roll": {
-        "func": roll_command,
+        "module": "commands.roll",
+        "handler": "roll_command",
         "description": "Rolls a number between 0 and 100",
         "usage": "roll"
     },
+    "dice": {
+        "module": "commands.dice",
+        "handler": "dice_roll",
+        "description": "Rolls dice expressions like 3d6+2 or 4d6k3 (keep highest 3)",
+        "usage": "dice <expression>",
+        "cpu_bound": True
+    },
     "note_add": {
-        "func": note_command,
+        "module": "commands.note",
+        "handler": "note_command",
         "description": "Add a note to the notes list",
         "usage": "note_add [text]"
     },
     "note_read": {
-        "func": note_command,
-        "description": "Read all stored notes",
-        "usage": "note_read"
+        "module": "commands.note",
+        "handler": "note_command",
+        "description": "Read stored notes, one page at a time",
+        "usage": "note_read [page]",
+        "cost": 3
+    },
+    "note_search": {
+        "module": "commands.note",
+        "handler": "note_command",
+        "description": "Find notes containing all given words",
+        "usage": "note_search <words> [page]",
+        "cost": 3
+    },
+    "note_from": {
+        "module": "commands.note",
+        "handler": "note_command",
+        "description": "List notes written by a user",
+        "usage": "note_from <user> [page]",
+        "cost": 3
     },
     "note_wipe": {
-        "func": note_command,
+        "module": "commands.note",
+        "handler": "note_command",
         "description": "Remove all stored notes",
         "usage": "note_wipe"
     },
     "funfact": {
-        "func": funfact_command,
+        "module": "commands.funfact",
+        "handler": "funfact_command",
         "description": "Returns a random fact. With option to specify category.",
         "usage": "funfact [category]"
     },
     "quote": {
-        "func": quote_command,
+        "module": "commands.quote",
+        "handler": "quote_command",
         "description": "Returns a random quote",
         "usage": "quote"
     },
     "flip": {
-        "func": flip_command,
+        "module": "commands.flip",
+        "handler": "flip_command",
         "description": "Flips a coin to be heads or tails.",
         "usage": "flip"
     },
     "joke": {
-        "func": joke_command,
+        "module": "commands.joke",
+        "handler": "joke_command",
         "description": "Returns a random joke",
         "usage": "joke"
+    },
+    "seen": {
+        "module": "commands.seen",
+        "handler": "seen_command",
+        "description": "Shows when a nick was last active",
+        "usage": "seen <nick>"
+    },
+    "grep": {
+        "module": "commands.grep",
+        "handler": "grep_command",
+        "description": "Finds recent messages in this channel containing text",
+        "usage": "grep <text> [count]",
+        "timeout": 30,
+        "cost": 3
+    },
+    "reload": {
+        "module": "commands.admin",
+        "handler": "reload_command",
+        "description": "Reloads config.toml without reconnecting",
+        "usage": "reload",
+        "admin": True
+    },
+    "stats": {
+        "module": "commands.stats",
+        "handler": "stats_command",
+        "description": "Shows traffic, queue and command latency stats",
+        "usage": "stats",
+        "admin": True
+    },
+    "profile": {
+        "module": "commands.profile",
+        "handler": "profile_command",
+        "description": "Starts or stops runtime profiling, reports go to logs/profiles",
+        "usage": "profile [start, stop, status]",
+        "timeout": 60,
+        "admin": True
     }
 }
+
+
+def get_handler(cmd_name: str):
+    # Import the command module on first use and keep the function on the entry
+    entry = COMMANDS[cmd_name]
+    func = entry.get("func")
+    if func is None:
+        module = importlib.import_module(entry["module"])
+        func = entry["func"] = getattr(module, entry["handler"])
+    return func
@@ -0,0 +1,37 @@
+from core.config import get_settings
+from utils.chat_logger import chat_last_seen, ChatLogUnavailable
+
+async def seen_command(bot, user, target, tokens=None):
+    if not tokens or len(tokens) < 2:
+        await bot.send_privmsg(target=target, message="Usage: seen <nick>")
+        return
+    
+    nick = tokens[1]
+    
+    if not get_settings().chat_log_enabled:
+        await bot.send_privmsg(target=target, message="Chat log is not available")
+        return
+    
+    try:
+        entries = await chat_last_seen(nick, bot.name)
+    except ChatLogUnavailable:
+        await bot.send_privmsg(target=target, message="Chat log is not available")
+        return
+    
+    # What was said is only shown in the channel it was said in, elsewhere only the time
+    here = next((entry for entry in entries if entry[1].lower() == target.lower()), None)
+    
+    if not entries:
+        message = f"I have not seen {nick}"
+    
+    elif here is None or here[1] == "PM":
+        timestamp, _, seen_nick, _ = entries[0]
+        message = f"{seen_nick} was last seen {timestamp} UTC"
+    
+    else:
+        timestamp, location, seen_nick, last_message = here
+        message = f"{seen_nick} was last seen {timestamp} UTC in {location}: {last_message}"
+        if entries[0] is not here:
+            message += f" (active elsewhere {entries[0][0]} UTC)"
+    
+    await bot.send_privmsg(target=target, message=message)
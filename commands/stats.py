@@ -0,0 +1,45 @@
+from core.metrics import metrics
+
+def _format_ms(seconds: float) -> str:
+    if seconds == float("inf"):
+        return "over 10s"
+    return f"{seconds * 1000:g}ms"
+
+async def stats_command(bot, user, target, tokens=None):
+    if not metrics.enabled:
+        await bot.send_privmsg(target=target, message="Metrics are disabled")
+        return
+    
+    uptime = int(metrics.collect_gauges()["bot_uptime_seconds"][0][1])
+    hours, rest = divmod(uptime, 3600)
+    minutes = rest // 60
+    
+    lag = metrics.histograms.get(("event_loop_lag_seconds", ()))
+    lag_p95 = _format_ms(lag.quantile(0.95)) if lag else "none"
+    
+    message = (
+        f"Uptime {hours}h{minutes}m, "
+        f"in {int(metrics.counter_total('irc_messages_in_total'))} lines "
+        f"({int(metrics.counter_total('irc_bytes_in_total')) // 1024} KB), "
+        f"out {int(metrics.counter_total('irc_messages_out_total'))} lines "
+        f"({int(metrics.counter_total('irc_bytes_out_total')) // 1024} KB), "
+        f"queue {bot.queue_depth}, "
+        f"errors {int(metrics.counter_total('bot_command_errors_total'))}, "
+        f"loop lag p95 {lag_p95}"
+    )
+    await bot.send_privmsg(target=target, message=message)
+    
+    # Busiest commands with their p95 latency
+    command_stats = [
+        (dict(labels)["command"], histogram)
+        for (name, labels), histogram in metrics.histograms.items()
+        if name == "bot_command_duration_seconds"
+    ]
+    command_stats.sort(key=lambda item: item[1].count, reverse=True)
+    
+    if command_stats:
+        summary = ", ".join(
+            f"{cmd} {histogram.count}x p95 {_format_ms(histogram.quantile(0.95))}"
+            for cmd, histogram in command_stats[:6]
+        )
+        await bot.send_privmsg(target=target, message=f"Commands: {summary}")
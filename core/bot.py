@@ -1,27 +1,57 @@
 import asyncio
+import math
+import random
 import ssl
+import time
+from collections import deque
 
 # configs
-from core.config import config, is_command_enabled
+from core.config import config, get_settings, is_command_enabled
 
 # logger functions
-from core.logger import log_info, log_error, log_debug
+from core.logger import log_info, log_error, log_debug, log_warning
 
 # import all of the bot commands from one place
-from commands.registry import COMMANDS 
+from commands.registry import COMMANDS, get_handler
+
+from core.caps import CapNegotiator, DEFAULT_CAPS, HISTORY_BATCHES, SASL_NUMERICS
+from core.dispatcher import CommandDispatcher
+from core.process_pool import command_pool, CommandResultTooLarge
+from core.recorder import create_recorder
+from core.parser import parse_message
+from core.metrics import metrics
 
 # util
 from utils.chat_logger import log_chat
-from utils.text import sanitize_text
+from utils.text import sanitize_text, split_message, pack_messages
+from utils.rate_limit import TokenBucket, CommandRateLimiter
+
+# Maximum IRC line length in bytes, including CR LF
+IRC_LINE_LIMIT = 512
+
+# Longest user and host parts assumed for our own prefix until the server shows it
+MAX_USER_LENGTH = 10
+MAX_HOST_LENGTH = 63
 
 class IRCBot:
-    def __init__(self, server, port, nickname, channel, use_ssl, cmd_prefix="!"):
+    def __init__(self, server, port, nickname, channels, use_ssl, cmd_prefix=None, name=None, alt_nickname=None,
+                 sasl_username=None, sasl_password=None):
         # Bot connection info
         self.server = server
         self.port = port
         self.nick = nickname
-        self.channel = channel if channel.startswith("#") else f"#{channel}"
-        self.cmd_prefix = cmd_prefix
+        self.base_nick = nickname
+        self.alt_nick = alt_nickname
+        self._cmd_prefix = cmd_prefix
+        
+        # One channel name or a list of channels
+        if isinstance(channels, str):
+            channels = [channels]
+        self.channels = [c if c.startswith("#") else f"#{c}" for c in channels]
+        
+        # Network name shown in log lines when running several networks
+        self.name = name
+        self.log_tag = f"[{name}] " if name else ""
         
         # SSL context if needed
         self.use_ssl = use_ssl
@@ -31,6 +61,81 @@ class IRCBot:
         self.reader = None
         self.writer = None
         self.connected = False
+        
+        # Outbound queue, drained by a dedicated writer task
+        flood_cfg = config.get("flood", {})
+        send_rate = float(flood_cfg.get("send_rate", 2.0))
+        send_burst = int(flood_cfg.get("send_burst", 5))
+        self.max_batch_lines = max(1, int(flood_cfg.get("max_batch_lines", send_burst or 1)))
+        self.max_queue_lines = int(flood_cfg.get("max_queue_lines", 1000))
+        self.merge_replies = flood_cfg.get("merge_replies", True)
+        
+        # Our own nick!user@host as the server relays it, learned from our JOIN echo
+        self.own_prefix = None
+        
+        # Send rate 0 disables pacing (only safe on servers without flood limits)
+        self.send_bucket = TokenBucket(send_rate, max(1, send_burst)) if send_rate > 0 else None
+        
+        self._send_queue = deque()
+        self._priority_queue = deque()
+        self._send_event = asyncio.Event()
+        self._writer_task = None
+        
+        # Commands run as tasks so the read loop never waits on them
+        dispatch_cfg = config.get("dispatch", {})
+        self.dispatcher = CommandDispatcher(
+            max_concurrent=dispatch_cfg.get("max_concurrent_commands", 8),
+            default_timeout=float(dispatch_cfg.get("command_timeout", 10)),
+        )
+        
+        # Command rate limits per user, channel and command
+        limit_cfg = config.get("rate_limit", {})
+        self.rate_limiter = CommandRateLimiter(
+            user_rate=float(limit_cfg.get("user_rate", 0.2)),
+            user_burst=float(limit_cfg.get("user_burst", 5)),
+            channel_rate=float(limit_cfg.get("channel_rate", 1.0)),
+            channel_burst=float(limit_cfg.get("channel_burst", 10)),
+            command_rate=float(limit_cfg.get("command_rate", 2.0)),
+            command_burst=float(limit_cfg.get("command_burst", 20)),
+            max_keys=int(limit_cfg.get("max_keys", 5000)),
+            enabled=limit_cfg.get("enabled", True),
+        )
+        self.cooldown_notice = limit_cfg.get("cooldown_notice", True)
+        
+        # IRCv3 capabilities, negotiated before registration completes
+        caps_cfg = config.get("caps", {})
+        self.caps = CapNegotiator(
+            caps_cfg.get("request", DEFAULT_CAPS) if caps_cfg.get("enabled", True) else [],
+            sasl_username=sasl_username,
+            sasl_password=sasl_password,
+            sasl_required=caps_cfg.get("sasl_required", False),
+            log_tag=self.log_tag,
+        )
+        
+        # Open batches, reference -> (type, parent reference)
+        self.batches = {}
+        
+        # Reconnect settings
+        reconnect_cfg = config.get("reconnect", {})
+        self.reconnect_initial_delay = float(reconnect_cfg.get("initial_delay", 2))
+        self.reconnect_max_delay = float(reconnect_cfg.get("max_delay", 300))
+        self.read_timeout = float(reconnect_cfg.get("read_timeout", 300))
+        self.ping_interval = float(reconnect_cfg.get("ping_interval", 120))
+        
+        # Inbound traffic recorder, set by run() when [recording] is enabled
+        self.recorder = None
+        
+        # Connection metrics
+        self.reconnect_count = 0
+        self.total_downtime = 0.0
+        self.down_since = None
+        
+        # Runtime metrics for this connection
+        self.metric_labels = (("network", name or "default"),)
+        metrics.add_gauge("bot_send_queue_depth", lambda: [(self.metric_labels, self.queue_depth)])
+        metrics.add_gauge("bot_pending_commands", lambda: [(self.metric_labels, self.dispatcher.pending)])
+        metrics.add_gauge("bot_reconnects_total", lambda: [(self.metric_labels, self.reconnect_count)])
+        metrics.add_gauge("bot_downtime_seconds_total", lambda: [(self.metric_labels, self.total_downtime)])
 
     # Connect to IRC server and register nick
     async def connect(self):
@@ -42,174 +147,580 @@ class IRCBot:
                 ssl=self.ssl_context,
             )
         except Exception as e:
-            log_error(f"Failed to connect: {e}")
+            log_error(f"{self.log_tag}Failed to connect: {e}")
             return False
         
-        # Register nick
-        await self.send_raw(f"NICK {self.nick}")
-        await self.send_raw(f"USER {self.nick} 0 * :{self.nick}")
+        # Start outbound writer for this connection
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        
+        # Register nick, registration lines go ahead of replies queued while disconnected
+        # CAP goes out with NICK/USER in one write, the server holds registration until CAP END
+        self.nick = self.base_nick
+        self.own_prefix = None
+        for line in self.caps.start():
+            await self.send_raw(line, priority=True)
+        await self.send_raw(f"NICK {self.nick}", priority=True)
+        await self.send_raw(f"USER {self.nick} 0 * :{self.nick}", priority=True)
         
         return True
 
-    # Send raw IRC line
-    async def send_raw(self, line: str):
-        if not self.writer:
-            return
+    # Close current connection, queued replies are kept for the next one
+    async def disconnect(self):
+        await self._stop_writer()
         
-        # Write line to server
-        self.writer.write(f"{line}\r\n".encode())
-        await self.writer.drain()
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except Exception as e:
+                log_debug(f"{self.log_tag}Error while closing connection: {e}")
+        
+        self.reader = None
+        self.writer = None
+        self.connected = False
+        self.batches.clear()
+        
+        # Registration lines and PONGs belong to the old connection
+        self._priority_queue.clear()
         
-        # Log sent line
-        log_info(f"<send> {line}")
+        if self.down_since is None:
+            self.down_since = time.monotonic()
+
+    # Command prefix, follows the live config unless set for this bot
+    @property
+    def cmd_prefix(self) -> str:
+        return self._cmd_prefix or get_settings().command_prefix
+
+    # Main channel, used as fallback target for events without a channel
+    @property
+    def channel(self) -> str:
+        return self.channels[0]
+
+    # Number of lines waiting to be sent
+    @property
+    def queue_depth(self) -> int:
+        return len(self._send_queue) + len(self._priority_queue)
 
-    # Send PRIVMSG
+    # Lines the writer may send now, normal lines wait until registration is done
+    def _has_sendable(self) -> bool:
+        return bool(self._priority_queue) or (self.connected and bool(self._send_queue))
+
+    # Queue raw IRC line, priority lines (like PONG) skip ahead of queued replies
+    async def send_raw(self, line: str, priority: bool = False):
+        if priority:
+            if not self.writer:
+                return
+            self._priority_queue.append(line)
+        
+        else:
+            # Replies are kept while reconnecting, up to max_queue_lines
+            if len(self._send_queue) >= self.max_queue_lines:
+                log_debug("%sSend queue full, dropped: %s", self.log_tag, line)
+                return
+            self._send_queue.append(line)
+        
+        self._send_event.set()
+
+    # Take as many queued lines as the send budget allows, returns the batch and how many are priority lines
+    def _next_batch(self, budget: int) -> tuple[list[str], int]:
+        batch = []
+        while len(batch) < budget and self._priority_queue:
+            batch.append(self._priority_queue.popleft())
+        urgent = len(batch)
+        while len(batch) < budget and self.connected and self._send_queue:
+            batch.append(self._send_queue.popleft())
+        return batch, urgent
+
+    # Writer task, coalesces pending lines into one write and paces them with the token bucket
+    async def _writer_loop(self):
+        try:
+            while True:
+                # Sleep until something can be sent
+                if not self._has_sendable():
+                    self._send_event.clear()
+                    await self._send_event.wait()
+                
+                # Wait for at least one token before sending
+                # Registration (NICK, USER, CAP, SASL) is not paced, it is a handful of lines
+                # the server answers before anything is relayed, pacing starts with JOIN
+                budget = self.max_batch_lines
+                paced = self.send_bucket is not None and self.connected
+                if paced:
+                    delay = self.send_bucket.wait_time()
+                    if delay:
+                        await asyncio.sleep(delay)
+                    budget = min(budget, max(1, self.send_bucket.available()))
+                
+                batch, urgent = self._next_batch(budget)
+                if not batch:
+                    continue
+                
+                if paced:
+                    self.send_bucket.consume(len(batch))
+                
+                # One write and one drain for the whole batch
+                data = "".join(f"{line}\r\n" for line in batch).encode()
+                try:
+                    self.writer.write(data)
+                    await self.writer.drain()
+                except Exception:
+                    # Replies go back for the next connection, priority lines belong to this one
+                    self._send_queue.extendleft(reversed(batch[urgent:]))
+                    raise
+                
+                metrics.inc("irc_messages_out_total", len(batch), self.metric_labels)
+                metrics.inc("irc_bytes_out_total", len(data), self.metric_labels)
+                
+                # Log sent lines, without SASL credentials
+                for line in batch:
+                    if line.startswith("AUTHENTICATE ") and line != "AUTHENTICATE PLAIN":
+                        line = "AUTHENTICATE ****"
+                    log_info("%s<send> %s", self.log_tag, line)
+        
+        except asyncio.CancelledError:
+            raise
+        
+        # A stopped writer would leave every later line queued, close the connection
+        # so the read loop ends and run() reconnects with a new writer
+        except Exception as e:
+            log_error(f"{self.log_tag}Writer task stopped, reconnecting: ", exc=e)
+            if self.writer:
+                self.writer.close()
+
+    # Stop writer task
+    async def _stop_writer(self):
+        if self._writer_task:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+
+    # Bytes left for the text of a PRIVMSG to target
+    def privmsg_budget(self, target: str) -> int:
+        # The server relays ":nick!user@host PRIVMSG target :text\r\n" to others,
+        # that line has to fit the limit, not just the one we send
+        if self.own_prefix:
+            prefix_size = len(self.own_prefix.encode())
+        else:
+            prefix_size = len(self.nick.encode()) + 1 + MAX_USER_LENGTH + 1 + MAX_HOST_LENGTH
+        
+        overhead = 1 + prefix_size + len(f" PRIVMSG {target} :\r\n".encode())
+        return IRC_LINE_LIMIT - overhead
+    
+    # Send PRIVMSG, long messages are split on word boundaries
     async def send_privmsg(self, target: str, message: str):
         # Sanitize text
         message = sanitize_text(message)
         
-        # Send PRIVMSG to target (channel or user)
-        await self.send_raw(f"PRIVMSG {target} :{message}")
+        await self._send_privmsg_lines(target, split_message(message, self.privmsg_budget(target)))
+    
+    # Send several reply messages, short ones are merged into one line when enabled
+    async def send_privmsgs(self, target: str, messages: list[str]):
+        messages = [message for message in map(sanitize_text, messages) if message]
+        budget = self.privmsg_budget(target)
         
-        # Log message if chat logging is enabled
-        if config["logging"].get("chat_log_enabled", True):
-            await log_chat(self.nick, target, message)
+        if self.merge_replies:
+            lines = pack_messages(messages, budget)
+        else:
+            lines = [line for message in messages for line in split_message(message, budget)]
+        
+        await self._send_privmsg_lines(target, lines)
+    
+    async def _send_privmsg_lines(self, target: str, lines: list[str]):
+        # With echo-message our lines are logged when the server relays them back
+        chat_log_enabled = get_settings().chat_log_enabled and "echo-message" not in self.caps
+        
+        for line in lines:
+            # Send PRIVMSG to target (channel or user)
+            await self.send_raw(f"PRIVMSG {target} :{line}")
+            
+            # Log message if chat logging is enabled
+            if chat_log_enabled:
+                await log_chat(self.nick, target, line, sanitized=True, network=self.name)
 
     # Respond to server PINGs
-    async def handle_ping(self, parts):
-        await self.send_raw(f"PONG {parts[1]}")
+    async def handle_ping(self, msg):
+        token = msg.trailing if msg.trailing is not None else " ".join(msg.params)
+        await self.send_raw(f"PONG :{token}", priority=True)
 
-    # Handle welcome message and join channel
+    # Handle welcome message and join channels
     async def handle_welcome(self):
-        await self.send_raw(f"JOIN {self.channel}")
+        # Several channels per JOIN line, kept short enough for the line limit
+        # JOIN goes ahead of replies that were queued while disconnected
+        batch = []
+        for channel in self.channels:
+            if batch and len(",".join(batch)) + len(channel) > 400:
+                await self.send_raw(f"JOIN {','.join(batch)}", priority=True)
+                batch = []
+            batch.append(channel)
+        
+        if batch:
+            await self.send_raw(f"JOIN {','.join(batch)}", priority=True)
+        
+        # Registered, writer may now send queued replies
         self.connected = True
-        log_info(f"Joined {self.channel}")
+        self._send_event.set()
+        log_info(f"{self.log_tag}Joined {', '.join(self.channels)}")
+        
+        # Report downtime after a reconnect
+        if self.down_since is not None:
+            downtime = time.monotonic() - self.down_since
+            self.down_since = None
+            self.reconnect_count += 1
+            self.total_downtime += downtime
+            log_info(
+                f"{self.log_tag}Reconnected after {downtime:.1f}s downtime "
+                f"(reconnects: {self.reconnect_count}, total downtime: {self.total_downtime:.1f}s, "
+                f"queued lines: {self.queue_depth})"
+            )
+
+    # Send the replies of capability negotiation and SASL
+    async def _send_cap_lines(self, lines: list[str]):
+        for line in lines:
+            await self.send_raw(line, priority=True)
+
+    # BATCH +ref type [params] opens a batch, BATCH -ref closes it
+    def handle_batch(self, msg):
+        if not msg.params:
+            return
+        
+        ref = msg.params[0]
+        if ref.startswith("+") and len(msg.params) > 1:
+            self.batches[ref[1:]] = (msg.params[1], msg.batch)
+        elif ref.startswith("-"):
+            self.batches.pop(ref[1:], None)
+
+    # Message replayed from history (chathistory or bouncer playback), not live
+    def is_history(self, msg) -> bool:
+        ref = msg.batch
+        while ref is not None:
+            batch = self.batches.get(ref)
+            if batch is None:
+                return False
+            if batch[0] in HISTORY_BATCHES:
+                return True
+            ref = batch[1]
+        return False
+
+    # Server time of a message if server-time is enabled, otherwise None (now)
+    def message_time(self, msg):
+        return msg.time if "server-time" in self.caps else None
+
+    # Nick taken during registration, try the alternative nick or append "_"
+    async def handle_nick_in_use(self):
+        if self.alt_nick and self.nick != self.alt_nick:
+            self.nick = self.alt_nick
+        else:
+            self.nick = f"{self.nick}_"
+        
+        log_warning(f"{self.log_tag}Nick in use, trying {self.nick}")
+        await self.send_raw(f"NICK {self.nick}", priority=True)
 
     # Handle events like, JOIN, PART, QUIT for logging
-    async def handle_event(self, user, command, parts):
-        # Target of the event (channel or fallback)
-        target = parts[2] if len(parts) > 2 else self.channel
+    async def handle_event(self, msg):
+        # Our own JOIN echo shows the prefix others see on our messages
+        if msg.command == "JOIN" and msg.nick == self.nick and msg.prefix:
+            self.own_prefix = msg.prefix
+        
+        # Played back events happened while we were away or are already logged
+        if self.is_history(msg):
+            return
+        
+        # Target of the event (channel or fallback, QUIT has no channel)
+        target = msg.target if msg.command != "QUIT" and msg.target else self.channel
         
         # Log the event in chat log
-        if config["logging"].get("chat_log_enabled", True):
-            await log_chat(user, target, command.lower())
+        if get_settings().chat_log_enabled:
+            await log_chat(msg.nick, target, msg.command.lower(), sanitized=True, when=self.message_time(msg), network=self.name)
 
     # Handle PRIVMSG (channel or private message)
-    async def handle_privmsg(self, user, parts, line):
-        if len(parts) < 3 or " :" not in line:
+    async def handle_privmsg(self, msg):
+        if not msg.params or msg.trailing is None:
             return
         
-        raw_target = parts[2] # Channel or bot nickname
-        _, msg_text = line.split(" :", 1)
-        msg_text = msg_text.strip()
+        metrics.inc("irc_privmsg_in_total", 1, self.metric_labels)
+        
+        user = msg.nick
+        raw_target = msg.params[0] # Channel or bot nickname
+        msg_text = msg.trailing.strip()
         
         # Early return if message text is empty
         if not msg_text:
             return
         
+        # History playback is never run as commands
+        if self.is_history(msg):
+            log_debug("%sSkipped played back message from %s", self.log_tag, user)
+            return
+        
+        # One settings snapshot for the whole message
+        settings = get_settings()
+        
+        # Our own message relayed back by echo-message, already sanitized when sent
+        if user == self.nick:
+            if msg.prefix and "!" in msg.prefix:
+                self.own_prefix = msg.prefix
+            if settings.chat_log_enabled:
+                await log_chat(user, raw_target, msg_text, sanitized=True, when=self.message_time(msg), network=self.name)
+            return
+        
         is_pm = raw_target == self.nick
-        allow_whispers = config["bot"].get("allow_whispers", False)
         
         # Ignore PMs if not allowed
-        if is_pm and not allow_whispers:
-            log_debug(f"Ignored PM from {user}")
+        if is_pm and not settings.allow_whispers:
+            log_debug("Ignored PM from %s", user)
             return
         
         # Validate user to avoid sending messages to full hostnames
         if user and is_pm:
             if any(c in user for c in ("!", "@", " ", ":")):
-                log_debug(f"Invalid user format received: {user}")
+                log_debug("Invalid user format received: %s", user)
                 return
         
         # Determine target (user for PM, channel otherwise)
         target = user if is_pm else raw_target
         
         # Log message if chat logging is enabled
-        if config["logging"].get("chat_log_enabled", True):
-            await log_chat(user, target, msg_text)
+        if settings.chat_log_enabled:
+            await log_chat(user, target, msg_text, when=self.message_time(msg), network=self.name)
         
         # Handle bot commands
-        if not msg_text.startswith(self.cmd_prefix):
+        cmd_prefix = self._cmd_prefix or settings.command_prefix
+        if not msg_text.startswith(cmd_prefix):
             return
         
         # Parse message content
         tokens = msg_text.split()
         raw_cmd = tokens[0]
-        cmd_name = raw_cmd[len(self.cmd_prefix):]
+        cmd_name = raw_cmd[len(cmd_prefix):]
         tokens = [cmd_name, *tokens[1:]]
         
         # Try to get command dict related to command from command registry
         cmd_entry = COMMANDS.get(cmd_name)
+        
+        if not cmd_entry:
+            # Command unknown, do not spam channel, command may be enabled for other bots
+            log_debug("Unknown command: %s", cmd_name)
+            return
+        
+        # Admin commands are ignored silently for everyone else
+        is_admin = settings.is_admin(msg.prefix)
+        if cmd_entry.get("admin") and not is_admin:
+            log_info("Ignored admin command '%s' from %s", cmd_name, msg.prefix)
+            return
+        
+        # Rate limit per user (by host, so nick changes do not help), channel and command
+        if not is_admin:
+            user_key = (self.name, msg.host or user)
+            allowed, retry_after = self.rate_limiter.check(
+                user_key, (self.name, target.lower()), cmd_name, cmd_entry.get("cost", 1)
+            )
+            
+            if not allowed:
+                metrics.inc("bot_commands_limited_total", 1, (("command", cmd_name),))
+                log_debug("Rate limited '%s' from %s in %s", cmd_name, user, target)
+                
+                # One notice per cooldown, everything else is dropped silently
+                if self.cooldown_notice and self.rate_limiter.should_notify(user_key):
+                    await self.send_privmsg(target, f"{user}: slow down, try again in {math.ceil(retry_after)}s")
+                return
+        
+        # Run command in the background, replies to the same target stay in order
+        self.dispatcher.submit(
+            target,
+            self.execute_command,
+            cmd_name, cmd_entry, user, target, tokens, is_pm,
+            name=cmd_name,
+            timeout=cmd_entry.get("timeout"),
+            on_timeout=self.handle_command_timeout,
+        )
 
+    # Execute a registry command (runs inside the dispatcher)
+    async def execute_command(self, cmd_name, cmd_entry, user, target, tokens, is_pm):
+        labels = (("command", cmd_name),)
+        started = time.perf_counter()
+        
         try:
-            if cmd_entry and is_command_enabled(cmd_name):
-                # Execute enabled command
-                await cmd_entry["func"](self, user, target, tokens)
-                log_info(f"Executed '{cmd_name}' from '{user}' in {'PM' if is_pm else target}")
+            if is_command_enabled(cmd_name):
+                if cmd_entry.get("cpu_bound"):
+                    # Computed in the process pool, only the reply comes back
+                    messages = await command_pool.run(cmd_entry["module"], cmd_entry["handler"], user, tokens)
+                    await self.send_privmsgs(target, messages)
+                else:
+                    # Execute enabled command, its module is imported on first use
+                    await get_handler(cmd_name)(self, user, target, tokens)
+                metrics.inc("bot_command_calls_total", 1, labels)
+                metrics.observe("bot_command_duration_seconds", time.perf_counter() - started, labels)
+                log_info("%sExecuted '%s' from '%s' in %s", self.log_tag, cmd_name, user, "PM" if is_pm else target)
             
-            elif cmd_entry and not is_command_enabled(cmd_name):
+            else:
                 # Inform target command is disabled
                 await self.send_privmsg(target, f"Disabled command: {cmd_name}")
                 
                 log_info(f"Ignored disabled command: {cmd_name}")
-            
-            else:
-                # Command unknown, do not spam channel, command may be enabled for other bots
-                log_debug(f"Unknown command: {cmd_name}")
+        
+        except asyncio.CancelledError:
+            raise
+        
+        except CommandResultTooLarge as e:
+            metrics.inc("bot_command_errors_total", 1, labels)
+            log_warning(f"Command {cmd_name} result dropped: {e}")
+            await self.send_privmsg(target, "Result too long to send")
         
         except Exception as e:
             # Log execution error and notify user with limited details
+            metrics.inc("bot_command_errors_total", 1, labels)
             log_error(f"Command error in {cmd_name}: ", exc=e)
             await self.send_privmsg(target, "Unexpected error, check logs")
 
-    # Main bot loop
-    async def run(self):
-        if not await self.connect():
+    # Notify target when a command was cancelled for taking too long
+    async def handle_command_timeout(self, target, cmd_name):
+        metrics.inc("bot_command_timeouts_total", 1, (("command", cmd_name),))
+        await self.send_privmsg(target, f"Command timed out: {cmd_name}")
+
+    # Parse one raw line and route it to its handler
+    async def handle_line(self, line: str):
+        msg = parse_message(line)
+        if msg is None:
             return
         
+        command = msg.command
+        
+        if command == "PING":
+            await self.handle_ping(msg)
+            return
+        
+        if command == "CAP":
+            await self._send_cap_lines(self.caps.handle_cap(msg))
+            return
+        
+        if command == "AUTHENTICATE":
+            await self._send_cap_lines(self.caps.handle_authenticate(msg))
+            return
+        
+        if command in SASL_NUMERICS:
+            await self._send_cap_lines(self.caps.handle_sasl_numeric(msg))
+            return
+        
+        if command == "BATCH":
+            self.handle_batch(msg)
+            return
+        
+        # IRC numeric reply 001 signals end of welcome
+        if not self.connected and command == "001":
+            # Servers without CAP support register without waiting for CAP END
+            self.caps.negotiating = False
+            await self.handle_welcome()
+            return
+        
+        # ERR_NICKNAMEINUSE during registration
+        if not self.connected and command == "433":
+            await self.handle_nick_in_use()
+            return
+        
+        if command in ("JOIN", "PART", "QUIT"):
+            await self.handle_event(msg)
+            return
+        
+        if command == "PRIVMSG":
+            await self.handle_privmsg(msg)
+
+    # Backoff before the next connection attempt, exponential with jitter and a cap
+    def _reconnect_delay(self, attempt: int) -> float:
+        delay = min(self.reconnect_max_delay, self.reconnect_initial_delay * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    # Read lines until the server closes the connection or goes silent
+    async def _read_loop(self):
+        last_read = time.monotonic()
+        pinged = False
+        
         while True:
+            # A quiet link gets one PING of our own before it counts as dead
+            ping_due = 0 < self.ping_interval < self.read_timeout and not pinged
+            timeout = (self.ping_interval if ping_due else self.read_timeout) - (time.monotonic() - last_read)
+            
             try:
-                raw = await self.reader.readline()
-                if not raw:
-                    continue
-                
-                line = raw.decode("utf-8", errors="ignore").strip()
-                if not line:
-                    continue
-                
-                log_debug(f"<recv> {line}")
-                
-                parts = line.split()
-                if len(parts) < 2:
-                    continue
-                
-                prefix = parts[0]  # Sender or server prefix
-                command = parts[1]
-                user = prefix[1:prefix.find("!")] if "!" in prefix else prefix
-                
-                if command == "PING":
-                    await self.handle_ping(parts)
-                    continue
-                
-                # IRC numeric reply 001 signals end of welcome
-                if not self.connected and command == "001":
-                    await self.handle_welcome()
-                    continue
-                
-                if command in ("JOIN", "PART", "QUIT"):
-                    await self.handle_event(user, command, parts)
+                raw = await asyncio.wait_for(self.reader.readline(), max(timeout, 0))
+            
+            except asyncio.TimeoutError:
+                if ping_due:
+                    pinged = True
+                    await self.send_raw(f"PING :{self.server}", priority=True)
                     continue
                 
-                if command == "PRIVMSG":
-                    await self.handle_privmsg(user, parts, line)
+                log_warning(f"{self.log_tag}No data from server for {self.read_timeout:.0f}s")
+                return
+            
+            except (ConnectionError, OSError) as e:
+                log_warning(f"{self.log_tag}Connection lost: {e}")
+                return
             
+            # Line longer than the stream limit, the rest of the stream cannot be trusted
+            except ValueError as e:
+                log_warning(f"{self.log_tag}Invalid data from server, reconnecting: {e}")
+                return
+            
+            last_read = time.monotonic()
+            pinged = False
+            
+            # wait_for drops a cancel that races with a finished read (before Python 3.12)
+            if asyncio.current_task().cancelling():
+                raise asyncio.CancelledError
+            
+            # Empty read means the server closed the connection
+            if not raw:
+                log_warning(f"{self.log_tag}Server closed the connection")
+                return
+            
+            metrics.inc("irc_messages_in_total", 1, self.metric_labels)
+            metrics.inc("irc_bytes_in_total", len(raw), self.metric_labels)
+            
+            line = raw.decode("utf-8", errors="ignore").strip()
+            if not line:
+                continue
+            
+            log_debug("%s<recv> %s", self.log_tag, line)
+            
+            if self.recorder:
+                self.recorder.record(line)
+            
+            try:
+                await self.handle_line(line)
             except Exception as e:
-                log_error(f"Fatal error: ", e)
+                log_error(f"{self.log_tag}Error handling line: {line}", exc=e)
+
+    # Main bot loop, reconnects until cancelled
+    async def run(self):
+        attempt = 0
+        
+        self.recorder = create_recorder(self)
+        if self.recorder:
+            await self.recorder.start()
+        
+        try:
+            while True:
+                if await self.connect():
+                    await self._read_loop()
+                    
+                    # Start backoff over after a session that got registered
+                    if self.connected:
+                        attempt = 0
                 
-                # Close connection gracefully
-                if self.writer:
-                    self.writer.close()
-                    await self.writer.wait_closed()
+                await self.disconnect()
                 
-                # Exit run method
-                return
+                delay = self._reconnect_delay(attempt)
+                attempt += 1
+                log_info(f"{self.log_tag}Reconnecting in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        
+        finally:
+            # Close connection gracefully
+            await self.dispatcher.shutdown()
+            await self.disconnect()
+            
+            if self.recorder:
+                await self.recorder.stop()
+                self.recorder = None
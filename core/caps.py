@@ -0,0 +1,211 @@
+import base64
+
+from core.logger import log_info, log_warning, log_debug
+
+# Capabilities the bot knows how to use, name -> what it is used for
+SUPPORTED_CAPS = {
+    "sasl": "log in during registration (PLAIN), no NickServ round-trip after 001",
+    "server-time": "chat log timestamps from the server's time tag",
+    "message-tags": "tags on all messages, not only on server generated ones",
+    "batch": "history playback is recognized and not run as live commands",
+    "echo-message": "own messages are chat logged as the server relayed them",
+    "cap-notify": "capabilities added or removed while connected (CAP NEW and DEL)",
+}
+
+# Requested unless [caps] request says otherwise
+DEFAULT_CAPS = ["server-time", "message-tags", "batch", "echo-message", "cap-notify"]
+
+# Batch types that replay old messages
+HISTORY_BATCHES = ("chathistory", "znc.in/playback")
+
+# AUTHENTICATE payloads are sent in chunks of this size
+SASL_CHUNK = 400
+
+# SASL replies
+RPL_LOGGEDIN = "900"
+RPL_SASLSUCCESS = "903"
+ERR_NICKLOCKED = "902"
+ERR_SASLFAIL = "904"
+ERR_SASLTOOLONG = "905"
+ERR_SASLABORTED = "906"
+ERR_SASLALREADY = "907"
+SASL_NUMERICS = (RPL_LOGGEDIN, ERR_NICKLOCKED, RPL_SASLSUCCESS, ERR_SASLFAIL,
+                 ERR_SASLTOOLONG, ERR_SASLABORTED, ERR_SASLALREADY)
+
+
+def parse_cap_list(text: str | None) -> dict:
+    # "sasl=PLAIN,EXTERNAL server-time -batch" -> {"sasl": "PLAIN,EXTERNAL", "server-time": "", "-batch": ""}
+    caps = {}
+    for item in (text or "").split():
+        name, _, value = item.partition("=")
+        caps[name] = value
+    return caps
+
+
+class CapNegotiator:
+    """
+    IRCv3 capability negotiation for one connection.
+
+    start() returns the lines sent together with NICK/USER, the handle_* methods
+    return the replies for the server's CAP, AUTHENTICATE and SASL lines. The server
+    holds registration until CAP END, so the whole exchange happens before 001.
+
+    Caps the server offered are remembered across reconnects. The next connection
+    sends CAP REQ right away and skips the CAP LS round-trip, a NAK falls back to CAP LS.
+    """
+
+    def __init__(self, wanted, sasl_username: str | None = None, sasl_password: str | None = None,
+                 sasl_required: bool = False, log_tag: str = ""):
+        self.log_tag = log_tag
+        self.sasl_username = sasl_username
+        self.sasl_password = sasl_password or ""
+        self.sasl_required = sasl_required
+
+        unknown = [cap for cap in wanted if cap not in SUPPORTED_CAPS]
+        if unknown:
+            log_warning(f"{log_tag}Ignoring unsupported capabilities: {', '.join(unknown)}")
+        self.wanted = [cap for cap in wanted if cap in SUPPORTED_CAPS and cap != "sasl"]
+        if sasl_username:
+            self.wanted.append("sasl")
+
+        # Offered by the server on the last connection, name -> value
+        self.available = {}
+        self.enabled = set()
+        self.negotiating = False
+        self._blind_request = False
+
+    def reset(self) -> None:
+        # New connection, nothing is enabled yet
+        self.enabled = set()
+        self.negotiating = False
+        self._blind_request = False
+
+    def __contains__(self, cap: str) -> bool:
+        return cap in self.enabled
+
+    def _wanted_available(self) -> list[str]:
+        caps = [cap for cap in self.wanted if cap in self.available]
+
+        # Only PLAIN is implemented, the value lists the server's mechanisms (if any)
+        if "sasl" in caps and self.available["sasl"] and "PLAIN" not in self.available["sasl"].split(","):
+            log_warning(f"{self.log_tag}Server does not offer SASL PLAIN ({self.available['sasl']})")
+            caps.remove("sasl")
+        return caps
+
+    def start(self) -> list[str]:
+        self.reset()
+        if not self.wanted:
+            return []
+
+        self.negotiating = True
+
+        # Reconnect, request what the server offered last time
+        caps = self._wanted_available()
+        if caps:
+            self._blind_request = True
+            return [f"CAP REQ :{' '.join(caps)}"]
+        return ["CAP LS 302"]
+
+    def _end(self) -> list[str]:
+        if not self.negotiating:
+            return []
+        self.negotiating = False
+        log_info(f"{self.log_tag}Capabilities: {', '.join(sorted(self.enabled)) or 'none'}")
+        return ["CAP END"]
+
+    def _sasl_failed(self, reason: str) -> list[str]:
+        log_warning(f"{self.log_tag}SASL authentication failed: {reason}")
+        if self.sasl_required:
+            self.negotiating = False
+            return ["QUIT :SASL authentication failed"]
+        return self._end()
+
+    ''' Server replies '''
+
+    def handle_cap(self, msg) -> list[str]:
+        # ":server CAP <nick> <subcommand> [*] :<caps>"
+        if len(msg.params) < 2:
+            return []
+
+        subcommand = msg.params[1].upper()
+        more = len(msg.params) > 2 and msg.params[2] == "*"
+        caps = parse_cap_list(msg.trailing)
+
+        if subcommand == "LS":
+            if not self._blind_request:
+                self.available.update(caps)
+            # Multiline LS, wait for the last line
+            if more or not self.negotiating:
+                return []
+            request = self._wanted_available()
+            if not request:
+                return self._end()
+            return [f"CAP REQ :{' '.join(request)}"]
+
+        if subcommand == "ACK":
+            self._blind_request = False
+            for name in caps:
+                if name.startswith("-"):
+                    self.enabled.discard(name[1:])
+                else:
+                    self.enabled.add(name)
+
+            if self.negotiating and "sasl" in caps and self.sasl_username:
+                return ["AUTHENTICATE PLAIN"]
+            return self._end()
+
+        if subcommand == "NAK":
+            log_debug("%sCapabilities rejected: %s", self.log_tag, msg.trailing)
+            if self._blind_request:
+                # Server changed since the last connection, ask what it offers now
+                self._blind_request = False
+                self.available = {}
+                return ["CAP LS 302"]
+            return self._end()
+
+        if subcommand == "NEW":
+            self.available.update(caps)
+            request = [cap for cap in self.wanted if cap in caps and cap not in self.enabled and cap != "sasl"]
+            return [f"CAP REQ :{' '.join(request)}"] if request else []
+
+        if subcommand == "DEL":
+            for name in caps:
+                self.available.pop(name, None)
+                self.enabled.discard(name)
+            log_info(f"{self.log_tag}Server removed capabilities: {', '.join(caps)}")
+
+        return []
+
+    def handle_authenticate(self, msg) -> list[str]:
+        # Server is ready for the PLAIN payload: authzid NUL authcid NUL password
+        if msg.target != "+":
+            return []
+
+        payload = f"{self.sasl_username}\0{self.sasl_username}\0{self.sasl_password}".encode()
+        encoded = base64.b64encode(payload).decode("ascii")
+
+        lines = [f"AUTHENTICATE {encoded[i:i + SASL_CHUNK]}" for i in range(0, len(encoded), SASL_CHUNK)]
+        # A payload of exactly n chunks is terminated by an empty one
+        if len(encoded) % SASL_CHUNK == 0:
+            lines.append("AUTHENTICATE +")
+        return lines
+
+    def handle_sasl_numeric(self, msg) -> list[str]:
+        command = msg.command
+
+        if command == RPL_LOGGEDIN:
+            log_info(f"{self.log_tag}Logged in: {msg.trailing}")
+            return []
+
+        # Only answered while registration waits for us
+        if not self.negotiating:
+            return []
+
+        if command in (RPL_SASLSUCCESS, ERR_SASLALREADY):
+            return self._end()
+
+        if command == ERR_NICKLOCKED:
+            return self._sasl_failed("account is locked")
+
+        # 904, 905, 906
+        return self._sasl_failed(msg.trailing or command)
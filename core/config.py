@@ -1,4 +1,7 @@
+import os
 import tomllib
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
 from pathlib import Path
 
 ''' Project paths '''
@@ -9,44 +12,172 @@ ROOT_DIR = Path(__file__).parent.parent
 # Config file
 CONFIG_FILE = ROOT_DIR / "config.toml"
 
-# Data dir
+# Data dir, created by whatever writes there first
 DATA_DIR = ROOT_DIR / "data"
-DATA_DIR.mkdir(parents=True, exist_ok = True)
 
-# Logs dir
+# Logs dir, created when the first log file is opened
 LOGS_DIR = ROOT_DIR / "logs"
-LOGS_DIR.mkdir(parents=True, exist_ok = True)
+
+# Shard number in a worker process of a sharded deployment (core/shards.py), None otherwise
+SHARD = int(os.environ["IRC_BOT_SHARD"]) if os.environ.get("IRC_BOT_SHARD") else None
 
 ''' Config loading '''
 
-with open(CONFIG_FILE, "rb") as f:
-    config = tomllib.load(f)
+def _read_config_file() -> dict:
+    with open(CONFIG_FILE, "rb") as f:
+        return tomllib.load(f)
+
+
+config = _read_config_file()
+
+
+''' Networks '''
+
+def _normalize_channels(channels) -> list[str]:
+    # Accept a single channel or a list, always return "#name" strings
+    if isinstance(channels, str):
+        channels = [c for c in channels.replace(",", " ").split() if c]
+    return [c if c.startswith("#") else f"#{c}" for c in channels]
+
+
+def _normalize_network(net: dict, section: str, named: bool) -> dict:
+    # Validate one network table and fill in defaults
+    channels = net.get("channels", net.get("channel"))
+    required = {
+        "server": net.get("server"),
+        "port": net.get("port"),
+        "nickname": net.get("nickname"),
+        "channel(s)": channels,
+    }
+    missing = [key for key, value in required.items() if value is None]
+    if missing:
+        raise ValueError(
+            f"Missing required config values in {section}: {', '.join(missing)}"
+        )
+
+    channels = _normalize_channels(channels)
+    if not channels:
+        raise ValueError(f"No channels configured in {section}")
+
+    port = int(net["port"])
+    return {
+        # Networks are named in logs, fall back to server hostname
+        "name": net.get("name", net["server"]) if named else None,
+        "server": net["server"],
+        "port": port,
+        "nickname": net["nickname"],
+        "alt_nickname": net.get("alt_nickname"),
+        # SASL PLAIN login during registration, empty means no login
+        "sasl_username": net.get("sasl_username") or None,
+        "sasl_password": net.get("sasl_password") or None,
+        "channels": channels,
+        # Fallback: assume SSL if using default SSL port
+        "use_ssl": net.get("use_ssl", port == 6697),
+    }
+
+
+def _load_networks(raw: dict) -> list[dict]:
+    # Either a single [irc] table or any number of [[networks]] tables
+    if raw.get("networks"):
+        return [
+            _normalize_network(net, f"[[networks]] #{i + 1}", named=True)
+            for i, net in enumerate(raw["networks"])
+        ]
+
+    if "irc" not in raw:
+        raise ValueError("Missing [irc] or [[networks]] section in config")
+
+    nets = [_normalize_network(raw["irc"], "[irc]", named=False)]
+
+    # Ensure use_ssl exists
+    raw["irc"]["use_ssl"] = nets[0]["use_ssl"]
+    return nets
+
+
+networks = _load_networks(config)
+
+
+''' Runtime settings '''
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """
+    Immutable snapshot of the settings read on every message.
+    Built once per config load, replaced as a whole on reload.
+    """
+    command_prefix: str
+    allow_whispers: bool
+    chat_log_enabled: bool
+    enabled_commands: frozenset
+    admins: tuple
+    max_notes: int
+    max_note_length: int
+    note_page_size: int
+
+    def is_admin(self, prefix: str | None) -> bool:
+        # Match full nick!user@host prefix against admin hostmasks, case-insensitive
+        if not prefix or not self.admins:
+            return False
+        prefix = prefix.lower()
+        return any(fnmatchcase(prefix, mask) for mask in self.admins)
+
+
+def _require_type(section: str, key: str, value, expected):
+    if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+        raise ValueError(f"Invalid config value [{section}] {key}: {value!r}")
+    return value
+
+
+def build_settings(raw: dict) -> Settings:
+    # Validate per-message settings and precompute lookups
+    bot_cfg = raw.get("bot", {})
+    logging_cfg = raw.get("logging", {})
+    notes_cfg = raw.get("notes", {})
+    commands_cfg = raw.get("commands", {})
+
+    admins = _require_type("bot", "admins", bot_cfg.get("admins", []), list)
+
+    return Settings(
+        command_prefix=_require_type("bot", "command_prefix", bot_cfg.get("command_prefix", "!"), str),
+        allow_whispers=_require_type("bot", "allow_whispers", bot_cfg.get("allow_whispers", False), bool),
+        chat_log_enabled=_require_type("logging", "chat_log_enabled", logging_cfg.get("chat_log_enabled", True), bool),
+        enabled_commands=frozenset(name for name, value in commands_cfg.items() if value is True),
+        admins=tuple(str(mask).lower() for mask in admins),
+        max_notes=_require_type("notes", "max_notes", notes_cfg.get("max_notes", 50), int),
+        max_note_length=_require_type("notes", "max_note_length", notes_cfg.get("max_note_length", 200), int),
+        note_page_size=max(1, _require_type("notes", "page_size", notes_cfg.get("page_size", 5), int)),
+    )
 
 
-''' Validate required values in config irc field '''
+_settings = build_settings(config)
 
-required = ["server", "port", "channel", "nickname"]
-missing = [key for key in required if config["irc"].get(key) is None]
-if missing:
-    raise ValueError(
-        f"Missing required config values: {', '.join(missing)}"
-    )
 
-# Ensure use_ssl exists
-if "use_ssl" not in config["irc"]:
-    # Fallback: assume SSL if using default SSL port
-    config["irc"]["use_ssl"] = config["irc"].get("port") == 6697
+def get_settings() -> Settings:
+    # Current settings snapshot, read it once per message and use its fields
+    return _settings
 
 
-''' Helpers '''
+def reload_config() -> Settings:
+    """
+    Re-read config.toml and swap in a new settings snapshot.
+    Raises on invalid config, the current settings stay active in that case.
+    Connection settings ([irc]/[[networks]], [flood], [dispatch], ...) still need a restart.
+    """
+    global _settings
 
-enabled_commands = []
-for key, value in config["commands"].items():
-    if value is True:
-        enabled_commands.append(key)
+    raw = _read_config_file()
+    _load_networks(raw)
+    new_settings = build_settings(raw)
 
+    # Swap both in one step, no await in between so handlers never see a mix
+    config.clear()
+    config.update(raw)
+    _settings = new_settings
+    return new_settings
+
+
+''' Helpers '''
 
 def is_command_enabled(command_name: str) -> bool:
     # Return True if the command is enabled or False if not
-    return bool(config["commands"].get(command_name, False))
-    
+    return command_name in _settings.enabled_commands
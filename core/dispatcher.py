@@ -0,0 +1,83 @@
+import asyncio
+
+from core.logger import log_error, log_debug
+
+
+class CommandDispatcher:
+    """
+    Run bot commands as background tasks.
+    Commands for the same target run one at a time in arrival order,
+    commands for different targets run concurrently up to max_concurrent.
+    """
+
+    def __init__(self, max_concurrent: int = 8, default_timeout: float = 10.0):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.default_timeout = default_timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        # target -> [lock, number of tasks using the lock]
+        self._target_locks = {}
+        self._tasks = set()
+
+    # Number of commands running or waiting to run
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, target: str, coro_func, *args, name: str = "", timeout: float | None = None, on_timeout=None) -> asyncio.Task:
+        """
+        Schedule coro_func(*args) for target and return the task.
+        on_timeout is an optional coroutine function called as on_timeout(target, name).
+        """
+        key = target.lower()
+        entry = self._target_locks.get(key)
+        if entry is None:
+            entry = self._target_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+
+        task = asyncio.create_task(
+            self._run(key, entry, coro_func, args, name, timeout, on_timeout, target)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, key, entry, coro_func, args, name, timeout, on_timeout, target):
+        lock = entry[0]
+        timeout = self.default_timeout if timeout is None else timeout
+
+        try:
+            # Per-target lock first so replies keep their order, then the global limit
+            async with lock:
+                async with self._semaphore:
+                    try:
+                        if timeout and timeout > 0:
+                            await asyncio.wait_for(coro_func(*args), timeout)
+                        else:
+                            await coro_func(*args)
+
+                    except asyncio.TimeoutError:
+                        log_error(f"Command '{name}' timed out after {timeout}s")
+                        if on_timeout:
+                            await on_timeout(target, name)
+
+                    except Exception as e:
+                        log_error(f"Dispatch error in {name}: ", exc=e)
+
+        finally:
+            # Drop lock when no other task for this target needs it
+            entry[1] -= 1
+            if entry[1] <= 0 and self._target_locks.get(key) is entry:
+                del self._target_locks[key]
+
+    async def shutdown(self) -> None:
+        # Cancel running and waiting commands
+        if not self._tasks:
+            return
+
+        log_debug(f"Cancelling {len(self._tasks)} pending command(s)")
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,23 +1,75 @@
+import atexit
+import gzip
 import logging
-from core.config import config, LOGS_DIR
+import os
+import shutil
+import logging.handlers
+import queue
+from core.config import config, LOGS_DIR, SHARD
 
-# Log file
-LOG_FILE = LOGS_DIR / "bot.log"
+# Log file, shard workers write their own
+LOG_FILE = LOGS_DIR / ("bot.log" if SHARD is None else f"bot.shard{SHARD}.log")
+
+logging_cfg = config.get("logging", {})
 
 # Read log levels from settings, fallback to defaults
-console_level = getattr(logging, config.get("logging", {}).get("console_level", "INFO").upper(), logging.INFO)
-file_level = getattr(logging, config.get("logging", {}).get("file_level", "DEBUG").upper(), logging.DEBUG)
+console_level = getattr(logging, logging_cfg.get("console_level", "INFO").upper(), logging.INFO)
+file_level = getattr(logging, logging_cfg.get("file_level", "DEBUG").upper(), logging.DEBUG)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    # Hand records to the listener thread as they are,
+    # message formatting happens there instead of on the event loop
+    def prepare(self, record):
+        return record
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    # Compress a rotated log, runs in the listener thread like all file writes
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _create_file_handler() -> logging.Handler:
+    # Plain file, or rotation by time ("midnight", "H", ...) or by size
+    # delay=True: the file is opened by the listener thread when the first record arrives
+    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+    rotate_when = logging_cfg.get("log_rotate_when", "")
+    max_bytes = int(logging_cfg.get("log_max_bytes", 0))
+    backup_count = int(logging_cfg.get("log_backup_count", 5))
+
+    if rotate_when:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            LOG_FILE, when=rotate_when, backupCount=backup_count, encoding="utf-8", utc=True, delay=True
+        )
+    elif max_bytes > 0:
+        handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+    else:
+        return logging.FileHandler(LOG_FILE, encoding="utf-8", delay=True)
+
+    # Rotated files become bot.log.1.gz, ... (or bot.log.<date>.gz)
+    if logging_cfg.get("log_compress", True):
+        handler.namer = lambda name: f"{name}.gz"
+        handler.rotator = _gzip_rotator
+    return handler
+
 
 # Create a custom logger
 logger = logging.getLogger("IRC_Bot")
-logger.setLevel(logging.DEBUG)  # Capture all levels, handlers filter individually
+
+# Drop records below both handler levels before any work is done
+logger.setLevel(min(console_level, file_level))
+logger.propagate = False
 
 # Console handler
 console_handler = logging.StreamHandler()
 console_handler.setLevel(console_level)
 
 # File handler
-file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
+file_handler = _create_file_handler()
 file_handler.setLevel(file_level)
 
 # Formatter
@@ -28,25 +80,43 @@ formatter = logging.Formatter(
 console_handler.setFormatter(formatter)
 file_handler.setFormatter(formatter)
 
-# Add handlers
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+# Handlers run in a background thread, the event loop only puts records on a queue
+log_queue = queue.SimpleQueue()
+queue_handler = DeferredQueueHandler(log_queue)
+listener = logging.handlers.QueueListener(
+    log_queue, console_handler, file_handler, respect_handler_level=True
+)
+
+logger.addHandler(queue_handler)
+listener.start()
+
+
+def stop_logging() -> None:
+    # Flush queued records and stop the listener thread
+    if listener._thread is not None:
+        listener.stop()
+
+
+atexit.register(stop_logging)
+
 
 # Helper functions for convenience
-def log_debug(msg: str) -> None:
-    logger.debug(msg)
-    
-def log_info(msg: str) -> None:
-    logger.info(msg)
+# Pass values as %-style args, e.g. log_debug("<recv> %s", line),
+# so messages are only formatted when the level is enabled
+def log_debug(msg: str, *args) -> None:
+    logger.debug(msg, *args)
+
+def log_info(msg: str, *args) -> None:
+    logger.info(msg, *args)
 
-def log_warning(msg: str, exc: Exception | None = None) -> None:
+def log_warning(msg: str, *args, exc: Exception | None = None) -> None:
     if exc:
-        logger.warning(msg, exc_info=(type(exc), exc, exc.__traceback__))
+        logger.warning(msg, *args, exc_info=(type(exc), exc, exc.__traceback__))
     else:
-        logger.warning(msg)
+        logger.warning(msg, *args)
 
-def log_error(msg: str, exc: Exception | None = None) -> None:
+def log_error(msg: str, *args, exc: Exception | None = None) -> None:
     if exc:
-        logger.error(msg, exc_info=(type(exc), exc, exc.__traceback__))
+        logger.error(msg, *args, exc_info=(type(exc), exc, exc.__traceback__))
     else:
-        logger.error(msg)
+        logger.error(msg, *args)
@@ -0,0 +1,245 @@
+import asyncio
+import time
+from bisect import bisect_left
+
+from core.config import config, SHARD
+from core.logger import log_info, log_error, log_debug
+
+metrics_cfg = config.get("metrics", {})
+
+# Latency buckets in seconds (upper bounds, +Inf is implicit)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help), used for Prometheus output
+METRIC_INFO = {
+    "irc_messages_in_total": ("counter", "Lines received from the server"),
+    "irc_bytes_in_total": ("counter", "Bytes received from the server"),
+    "irc_messages_out_total": ("counter", "Lines sent to the server"),
+    "irc_bytes_out_total": ("counter", "Bytes sent to the server"),
+    "irc_privmsg_in_total": ("counter", "PRIVMSG lines handled"),
+    "bot_command_calls_total": ("counter", "Commands executed"),
+    "bot_command_errors_total": ("counter", "Commands that raised an error"),
+    "bot_command_timeouts_total": ("counter", "Commands cancelled by timeout"),
+    "bot_commands_limited_total": ("counter", "Commands dropped by rate limiting"),
+    "bot_command_duration_seconds": ("histogram", "Command execution time"),
+    "event_loop_lag_seconds": ("histogram", "Event loop scheduling delay"),
+    "bot_send_queue_depth": ("gauge", "Lines waiting in the send queue"),
+    "bot_pending_commands": ("gauge", "Commands running or waiting to run"),
+    "bot_reconnects_total": ("counter", "Reconnects after a lost connection"),
+    "bot_downtime_seconds_total": ("counter", "Seconds spent disconnected"),
+    "bot_shard_restarts_total": ("counter", "Shard worker processes restarted by the coordinator"),
+    "bot_shards_running": ("gauge", "Shard worker processes running"),
+    "bot_uptime_seconds": ("gauge", "Seconds since metrics were started"),
+}
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket holding the q-quantile (good enough for a summary)
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """
+    In-process counters, histograms and gauges.
+    Labels are tuples of (name, value) pairs, e.g. (("command", "roll"),).
+    When disabled every update is a single attribute check.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started = time.monotonic()
+        self.counters = {}
+        self.histograms = {}
+
+        # name -> list of functions returning [(labels, value), ...]
+        self.gauges = {}
+
+    def inc(self, name: str, value: float = 1, labels: tuple = ()) -> None:
+        if not self.enabled:
+            return
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: tuple = ()) -> None:
+        if not self.enabled:
+            return
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def add_gauge(self, name: str, func) -> None:
+        # Gauges are read when metrics are rendered, no cost on the hot path
+        self.gauges.setdefault(name, []).append(func)
+
+    def counter_total(self, name: str) -> float:
+        return sum(value for (key, _), value in self.counters.items() if key == name)
+
+    def collect_gauges(self) -> dict:
+        samples = {"bot_uptime_seconds": [((), time.monotonic() - self.started)]}
+        for name, funcs in self.gauges.items():
+            for func in funcs:
+                try:
+                    samples.setdefault(name, []).extend(func())
+                except Exception as e:
+                    log_debug(f"Gauge {name} failed: {e}")
+        return samples
+
+    def render_prometheus(self) -> str:
+        lines = []
+        seen = set()
+
+        def header(name):
+            if name in seen:
+                return
+            seen.add(name)
+            metric_type, help_text = METRIC_INFO.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for name, samples in sorted(self.collect_gauges().items()):
+            header(name)
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            header(name)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels)
+    return "{" + inner + "}"
+
+
+# Shared metrics instance
+metrics = Metrics(enabled=metrics_cfg.get("enabled", True))
+
+
+''' Event loop lag '''
+
+async def _monitor_loop_lag(interval: float) -> None:
+    # Sleep for interval and measure how late the loop wakes us up
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        metrics.observe("event_loop_lag_seconds", lag)
+
+
+''' HTTP endpoint '''
+
+async def _handle_http(reader, writer) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+
+        # Skip request headers
+        while True:
+            header = await asyncio.wait_for(reader.readline(), 5)
+            if header in (b"\r\n", b"\n", b""):
+                break
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status = "200 OK"
+            body = metrics.render_prometheus().encode()
+        else:
+            status = "404 Not Found"
+            body = b"Not found\n"
+
+        writer.write(
+            f"HTTP/1.0 {status}\r\n"
+            f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    except Exception as e:
+        log_debug(f"Metrics request failed: {e}")
+
+    finally:
+        writer.close()
+
+
+_tasks = []
+_http_server = None
+
+
+async def start_metrics() -> None:
+    # Start loop lag monitor and the optional HTTP endpoint
+    global _http_server
+
+    if not metrics.enabled:
+        return
+
+    interval = float(metrics_cfg.get("loop_lag_interval", 1.0))
+    _tasks.append(asyncio.create_task(_monitor_loop_lag(interval)))
+
+    if metrics_cfg.get("http_enabled", False):
+        host = metrics_cfg.get("http_host", "127.0.0.1")
+        port = int(metrics_cfg.get("http_port", 9108))
+        # Shard workers serve on the following ports, the coordinator keeps http_port
+        if SHARD is not None:
+            port += SHARD + 1
+        try:
+            _http_server = await asyncio.start_server(_handle_http, host, port)
+            log_info(f"Metrics endpoint on http://{host}:{port}/metrics")
+        except OSError as e:
+            log_error(f"Failed to start metrics endpoint on {host}:{port}", exc=e)
+
+
+async def stop_metrics() -> None:
+    global _http_server
+
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+    if _http_server:
+        _http_server.close()
+        await _http_server.wait_closed()
+        _http_server = None
@@ -0,0 +1,286 @@
+import asyncio
+import json
+import os
+import re
+import shutil
+from json import JSONDecodeError
+from pathlib import Path
+
+import aiofiles
+
+from core.logger import log_info, log_warning
+
+
+WORD_RE = re.compile(r"\w+")
+
+
+def _encode(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def note_words(text: str) -> set[str]:
+    # Lower case words used for the search index
+    return set(WORD_RE.findall(text.lower()))
+
+
+class _NoteJournal:
+    # In-memory state of one journal file
+    __slots__ = ("path", "lock", "notes", "dead_records", "loaded", "dir_ready", "words", "authors")
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = asyncio.Lock()
+        self.notes = []
+        self.dead_records = 0
+        self.loaded = False
+        self.dir_ready = False
+
+        # Inverted indexes, word/author -> ascending positions in notes
+        self.words = {}
+        self.authors = {}
+
+    def index(self, position: int, note: dict) -> None:
+        for word in note_words(note.get("content", "")):
+            self.words.setdefault(word, []).append(position)
+        self.authors.setdefault(note.get("user", "").lower(), []).append(position)
+
+    def reset(self, notes: list) -> None:
+        self.notes = notes
+        self.words = {}
+        self.authors = {}
+        for position, note in enumerate(notes):
+            self.index(position, note)
+
+
+def _page(items: list, page: int, page_size: int) -> list:
+    start = (max(1, page) - 1) * page_size
+    return items[start:start + page_size]
+
+
+class NoteStore:
+    """
+    Append-only note storage, one journal file per channel or PM.
+    Each line in a journal is a record:
+        {"op": "add", "timestamp": ..., "user": ..., "content": ...}
+        {"op": "wipe"}
+    Adds and wipes are a single append, the current notes are kept in memory.
+    Journals are compacted once they hold more dead records than live ones.
+    Each journal keeps a word and author index that is updated on add and wipe,
+    so paged reads and searches never scan all notes.
+    """
+
+    def __init__(self, note_dir: Path, compact_threshold: int = 100):
+        self.note_dir = note_dir
+        self.compact_threshold = compact_threshold
+        self._journals = {}
+
+        # Shared pre-[[networks]] notes are converted once, whichever network comes first
+        self._shared_lock = asyncio.Lock()
+
+    def _journal(self, name: str) -> _NoteJournal:
+        journal = self._journals.get(name)
+        if journal is None:
+            journal = self._journals[name] = _NoteJournal(self.note_dir / f"{name}.jsonl")
+        return journal
+
+    async def _migrate_legacy(self, journal: _NoteJournal) -> None:
+        if journal.path.exists():
+            return
+
+        # Journals of [[networks]] live in <network>/, notes kept before that were shared
+        # by all networks. Every network starts from a copy of them
+        shared_path = self.note_dir / journal.path.name
+        if shared_path != journal.path:
+            async with self._shared_lock:
+                await self._convert_json(shared_path)
+                if not shared_path.exists():
+                    return
+
+                journal.path.parent.mkdir(parents=True, exist_ok=True)
+                journal.dir_ready = True
+                tmp_file = journal.path.with_suffix(".jsonl.tmp")
+                await asyncio.to_thread(shutil.copyfile, shared_path, tmp_file)
+                os.replace(tmp_file, journal.path)
+            log_info(f"Copied shared notes {shared_path.name} to {journal.path.parent.name}/")
+            return
+
+        await self._convert_json(journal.path)
+
+    async def _convert_json(self, path: Path) -> None:
+        # One-time conversion of the old <name>.json note list into a journal
+        legacy_file = path.with_suffix(".json")
+        if path.exists() or not legacy_file.exists():
+            return
+
+        async with aiofiles.open(legacy_file, "r", encoding="utf-8") as f:
+            content = await f.read()
+
+        try:
+            notes = json.loads(content) if content.strip() else []
+        except JSONDecodeError as e:
+            log_warning(f"Skipping migration of invalid note file {legacy_file}", exc=e)
+            return
+
+        tmp_file = path.with_suffix(".jsonl.tmp")
+        async with aiofiles.open(tmp_file, "w", encoding="utf-8") as f:
+            await f.write("".join(_encode({"op": "add", **note}) for note in notes))
+
+        os.replace(tmp_file, path)
+        os.replace(legacy_file, legacy_file.with_suffix(".json.migrated"))
+        log_info(f"Migrated {len(notes)} note(s) from {legacy_file.name}")
+
+    async def _load(self, journal: _NoteJournal) -> None:
+        # Replay journal into memory, called with the journal lock held
+        if journal.loaded:
+            return
+
+        await self._migrate_legacy(journal)
+
+        notes = []
+        dead_records = 0
+        line = ""
+
+        try:
+            async with aiofiles.open(journal.path, "r", encoding="utf-8") as f:
+                async for line in f:
+                    if not line.strip():
+                        continue
+
+                    try:
+                        record = json.loads(line)
+                    except JSONDecodeError:
+                        # Torn write from a crash, the rest of the journal is still usable
+                        log_warning(f"Skipping invalid record in {journal.path.name}")
+                        dead_records += 1
+                        continue
+
+                    if record.get("op") == "wipe":
+                        dead_records += len(notes) + 1
+                        notes = []
+                    else:
+                        record.pop("op", None)
+                        notes.append(record)
+
+        except FileNotFoundError:
+            pass
+
+        # A crash can leave the last line without its newline, the next append would be
+        # joined onto it and both records lost. End the line first
+        if line and not line.endswith("\n"):
+            async with aiofiles.open(journal.path, "a", encoding="utf-8") as f:
+                await f.write("\n")
+
+        journal.reset(notes)
+        journal.dead_records = dead_records
+        journal.loaded = True
+
+        await self._maybe_compact(journal)
+
+    async def _append(self, journal: _NoteJournal, record: dict) -> None:
+        # Directory is created with the first note of each journal instead of at import,
+        # journals of [[networks]] live in their own subdirectory
+        if not journal.dir_ready:
+            journal.path.parent.mkdir(parents=True, exist_ok=True)
+            journal.dir_ready = True
+
+        async with aiofiles.open(journal.path, "a", encoding="utf-8") as f:
+            await f.write(_encode(record))
+
+    async def _maybe_compact(self, journal: _NoteJournal) -> None:
+        # Rewrite journal with only live notes once dead records dominate
+        if journal.dead_records < self.compact_threshold:
+            return
+        if journal.dead_records < len(journal.notes):
+            return
+
+        tmp_file = journal.path.with_suffix(".jsonl.tmp")
+        async with aiofiles.open(tmp_file, "w", encoding="utf-8") as f:
+            await f.write("".join(_encode({"op": "add", **note}) for note in journal.notes))
+
+        os.replace(tmp_file, journal.path)
+        journal.dead_records = 0
+
+    async def read(self, name: str) -> list[dict]:
+        journal = self._journal(name)
+        async with journal.lock:
+            await self._load(journal)
+            return list(journal.notes)
+
+    async def count(self, name: str) -> int:
+        journal = self._journal(name)
+        async with journal.lock:
+            await self._load(journal)
+            return len(journal.notes)
+
+    async def add(self, name: str, note: dict, max_notes: int | None = None) -> bool:
+        """
+        Append note, returns False if max_notes is already reached.
+        Limit check and append happen under the same lock so concurrent adds cannot overshoot.
+        """
+        journal = self._journal(name)
+        async with journal.lock:
+            await self._load(journal)
+
+            if max_notes is not None and len(journal.notes) >= max_notes:
+                return False
+
+            await self._append(journal, {"op": "add", **note})
+            journal.notes.append(note)
+            journal.index(len(journal.notes) - 1, note)
+            return True
+
+    async def wipe(self, name: str) -> None:
+        journal = self._journal(name)
+        async with journal.lock:
+            await self._load(journal)
+
+            if not journal.notes and not journal.path.exists():
+                return
+
+            await self._append(journal, {"op": "wipe"})
+            journal.dead_records += len(journal.notes) + 1
+            journal.reset([])
+
+            await self._maybe_compact(journal)
+
+    async def read_page(self, name: str, page: int, page_size: int) -> tuple[list[dict], int]:
+        # Notes on one page (oldest first) and the total number of notes
+        journal = self._journal(name)
+        async with journal.lock:
+            await self._load(journal)
+            return _page(journal.notes, page, page_size), len(journal.notes)
+
+    async def search(self, name: str, terms: list[str], page: int, page_size: int) -> tuple[list[dict], int]:
+        """
+        Notes containing every word in terms (whole words, case-insensitive).
+        Returns the requested page and the total number of matches.
+        """
+        words = set()
+        for term in terms:
+            words |= note_words(term)
+        if not words:
+            return [], 0
+
+        journal = self._journal(name)
+        async with journal.lock:
+            await self._load(journal)
+
+            # Intersect starting from the rarest word
+            postings = sorted((journal.words.get(word, []) for word in words), key=len)
+            matches = set(postings[0])
+            for positions in postings[1:]:
+                if not matches:
+                    break
+                matches.intersection_update(positions)
+
+            positions = sorted(matches)
+            return [journal.notes[i] for i in _page(positions, page, page_size)], len(positions)
+
+    async def by_author(self, name: str, user: str, page: int, page_size: int) -> tuple[list[dict], int]:
+        # Notes written by user (case-insensitive), one page and the total
+        journal = self._journal(name)
+        async with journal.lock:
+            await self._load(journal)
+
+            positions = journal.authors.get(user.lower(), [])
+            return [journal.notes[i] for i in _page(positions, page, page_size)], len(positions)
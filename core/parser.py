@@ -0,0 +1,171 @@
+# IRC line parser
+#
+# Turns a raw line like
+#   @time=2024-01-01T00:00:00Z :nick!user@host PRIVMSG #channel :hello world
+# into a Message in a single pass.
+
+from datetime import datetime
+from operator import itemgetter, methodcaller
+from types import MappingProxyType
+
+
+# IRCv3 tag value escapes
+_TAG_ESCAPES = {
+    ":": ";",
+    "s": " ",
+    "\\": "\\",
+    "r": "\r",
+    "n": "\n",
+}
+
+
+# Tags of untagged lines
+_NO_TAGS = MappingProxyType({})
+
+_split_tag = methodcaller("split", "=", 1)
+
+# Parsed line heads (everything before " :"), keyed by the raw head.
+# The same sender keeps sending to the same target, so most lines reuse an entry.
+_heads = {}
+_cached_head = _heads.get
+_HEAD_CACHE_SIZE = 4096
+
+_new_message = tuple.__new__
+
+
+class Message(tuple):
+    # Built with tuple.__new__, a Python level __init__ costs more than the parsing itself.
+    # Everything except tags and trailing comes from the cached head, so it is parsed once.
+    __slots__ = ()
+
+    tags = property(itemgetter(0))          # IRCv3 tags (empty if none)
+    trailing = property(itemgetter(1))      # text after " :" or None
+    prefix = property(itemgetter(2))        # full prefix without ":" or None
+    command = property(itemgetter(3))       # upper case command or numeric
+    params = property(itemgetter(4))        # middle params as a tuple, trailing excluded
+    nick = property(itemgetter(5))          # nick (or server name) from the prefix or None
+    user = property(itemgetter(6))          # ident from the prefix or None
+    host = property(itemgetter(7))          # host from the prefix or None
+
+    # First param, falls back to trailing (some servers send "JOIN :#channel")
+    @property
+    def target(self):
+        if self[4]:
+            return self[4][0]
+        return self[1]
+
+    # IRCv3 server-time tag as an aware datetime, None if missing or invalid
+    @property
+    def time(self):
+        value = self[0].get("time")
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+
+    # Reference of the IRCv3 batch this message belongs to, None outside batches
+    @property
+    def batch(self):
+        return self[0].get("batch")
+
+    def __repr__(self):
+        return (
+            f"Message(command={self.command!r}, prefix={self.prefix!r}, "
+            f"params={self.params!r}, trailing={self.trailing!r}, tags={dict(self.tags)!r})"
+        )
+
+
+def _unescape_tag_value(value: str) -> str:
+    out = []
+    i = 0
+    length = len(value)
+    while i < length:
+        ch = value[i]
+        if ch == "\\":
+            i += 1
+            if i < length:
+                out.append(_TAG_ESCAPES.get(value[i], value[i]))
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _parse_tags(raw: str) -> dict:
+    # Usual case, no escapes and every tag has a value
+    if "\\" not in raw:
+        try:
+            return dict(map(_split_tag, raw.split(";")))
+        except ValueError:
+            pass
+
+    tags = {}
+    for item in raw.split(";"):
+        if not item:
+            continue
+        # "key" without a value gets "", same as "key="
+        key, _, value = item.partition("=")
+        tags[key] = _unescape_tag_value(value) if "\\" in value else value
+    return tags
+
+
+# Prefix, command and middle params of a line head, None if there is no command
+def _parse_head(head: str) -> tuple | None:
+    line = head
+
+    # Prefix (nick!user@host or server name)
+    prefix = nick = user = host = None
+    if line[:1] == ":":
+        prefix, _, line = line.partition(" ")
+        prefix = prefix[1:]
+
+        if "!" in prefix:
+            nick, _, rest = prefix.partition("!")
+            user, sep, host = rest.partition("@")
+            if not sep:
+                host = None
+        elif "@" in prefix:
+            nick, _, host = prefix.partition("@")
+        else:
+            nick = prefix
+
+    parts = line.split()
+    if not parts or parts[0][0] == ":":
+        # No command
+        return None
+
+    # Dropped all at once when full, refilling it is cheap
+    if len(_heads) >= _HEAD_CACHE_SIZE:
+        _heads.clear()
+
+    fields = _heads[head] = (prefix, parts[0].upper(), tuple(parts[1:]), nick, user, host)
+    return fields
+
+
+def parse_message(line: str) -> Message | None:
+    """
+    Parse one IRC line (without CRLF).
+    Returns None for empty or malformed lines.
+    """
+    if not line:
+        return None
+
+    # IRCv3 tags, untagged lines share one read-only empty mapping
+    tags = _NO_TAGS
+    if line[0] == "@":
+        raw_tags, _, line = line.partition(" ")
+        tags = _parse_tags(raw_tags[1:])
+        line = line.lstrip(" ")
+
+    # Trailing param, the prefix has no spaces so the first " :" is never inside it
+    head, sep, trailing = line.partition(" :")
+    if not sep:
+        trailing = None
+
+    fields = _cached_head(head) or _parse_head(head)
+    if fields is None:
+        return None
+
+    return _new_message(Message, (tags, trailing) + fields)
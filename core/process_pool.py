@@ -0,0 +1,154 @@
+import asyncio
+import importlib
+import multiprocessing
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from core.config import config
+from core.logger import log_info, log_warning, log_debug
+
+dispatch_cfg = config.get("dispatch", {})
+
+
+class CommandResultTooLarge(Exception):
+    pass
+
+
+''' Worker side '''
+
+def _init_worker() -> None:
+    # Ctrl+C is handled by the bot process, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _warm(modules: tuple) -> None:
+    # Import command modules ahead of the first call
+    for module in modules:
+        importlib.import_module(module)
+
+
+def _call(module: str, handler: str, args: tuple, max_result_bytes: int) -> list[str]:
+    func = getattr(importlib.import_module(module), handler)
+    result = func(*args)
+    messages = [result] if isinstance(result, str) else list(result)
+
+    # Checked here so an oversized result is never sent back to the bot
+    size = sum(len(message.encode()) for message in messages)
+    if size > max_result_bytes:
+        raise CommandResultTooLarge(f"{module}.{handler} returned {size} bytes (limit {max_result_bytes})")
+    return messages
+
+
+''' Bot side '''
+
+class CommandProcessPool:
+    """
+    Process pool for CPU-bound commands, so heavy work never blocks the event loop.
+    Handlers are plain functions returning reply message(s), looked up by module
+    and name inside the worker. Workers are started and warmed up front.
+    A call cancelled while running (timeout, shutdown) restarts the pool, a worker
+    cannot be interrupted otherwise. Other calls running at that moment fail.
+    """
+
+    def __init__(self, workers: int = 2, max_result_bytes: int = 4096):
+        self.workers = max(1, int(workers))
+        self.max_result_bytes = int(max_result_bytes)
+        self._executor = None
+        self._warm_modules = ()
+        self._warm_task = None
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def _create(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that runs threads (logging) and an event loop is unsafe
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        return self._executor
+
+    async def start(self, warm_modules=()) -> None:
+        # Start all workers and import command modules in them
+        self._warm_modules = tuple(warm_modules)
+        executor = self._executor or self._create()
+        loop = asyncio.get_running_loop()
+
+        # One warm-up call per worker, concurrent calls make the pool start every worker
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, _warm, self._warm_modules)
+            for _ in range(self.workers)
+        ))
+        log_info(f"Command process pool ready ({self.workers} workers)")
+
+    def _restart(self) -> None:
+        # Kill workers that may still be busy, the next call starts a fresh pool
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+
+        log_warning("Restarting command process pool")
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        # Warm the replacement in the background
+        if self._warm_modules:
+            self._warm_task = asyncio.get_running_loop().create_task(self.start(self._warm_modules))
+
+    async def run(self, module: str, handler: str, *args) -> list[str]:
+        # Run handler(*args) in a worker and return its reply messages
+        executor = self._executor or self._create()
+        future = asyncio.get_running_loop().run_in_executor(
+            executor, _call, module, handler, args, self.max_result_bytes
+        )
+
+        try:
+            return await future
+
+        except asyncio.CancelledError:
+            self._restart()
+            raise
+
+        except BrokenProcessPool:
+            # A worker died (killed, out of memory), replace the pool for later calls
+            if self._executor is executor:
+                self._restart()
+            raise
+
+    async def shutdown(self) -> None:
+        if self._warm_task:
+            self._warm_task.cancel()
+            self._warm_task = None
+
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+
+        log_debug("Stopping command process pool")
+        executor.shutdown(wait=False, cancel_futures=True)
+        await asyncio.to_thread(executor.shutdown, wait=True)
+
+
+# Shared pool for all bots
+command_pool = CommandProcessPool(
+    workers=dispatch_cfg.get("process_workers", 2),
+    max_result_bytes=dispatch_cfg.get("process_max_result_bytes", 4096),
+)
+
+
+async def start_command_pool(commands: dict, enabled) -> None:
+    # Only start workers when an enabled command needs them
+    modules = sorted({
+        entry["module"] for name, entry in commands.items()
+        if entry.get("cpu_bound") and name in enabled
+    })
+    if modules:
+        await command_pool.start(modules)
+
+
+async def stop_command_pool() -> None:
+    await command_pool.shutdown()
@@ -0,0 +1,249 @@
+import asyncio
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from core.config import config, ROOT_DIR, LOGS_DIR, SHARD
+from core.logger import log_info, log_warning, log_error
+
+profiling_cfg = config.get("profiling", {})
+
+PROFILE_DIR = LOGS_DIR / "profiles"
+
+
+def _code_label(code, cache: dict) -> str:
+    # "core/bot.py:IRCBot.handle_line", paths relative to the project when possible
+    label = cache.get(code)
+    if label is None:
+        path = Path(code.co_filename)
+        try:
+            path = path.relative_to(ROOT_DIR)
+        except ValueError:
+            path = Path(path.name)
+        label = cache[code] = f"{path.as_posix()}:{getattr(code, 'co_qualname', code.co_name)}"
+    return label
+
+
+def _callback_label(handle) -> str:
+    # Name of what a loop callback ran. For task steps the await chain of the task,
+    # e.g. "core/dispatcher.py:CommandDispatcher._run > core/bot.py:IRCBot.execute_command > ..."
+    callback = getattr(handle, "_callback", None)
+    owner = getattr(callback, "__self__", None)
+
+    if isinstance(owner, asyncio.Task):
+        labels = []
+        coro = owner.get_coro()
+        while coro is not None and getattr(coro, "cr_code", None) is not None:
+            labels.append(_code_label(coro.cr_code, {}))
+            coro = coro.cr_await
+        return " > ".join(labels) or repr(owner.get_coro())
+
+    code = getattr(callback, "__code__", None)
+    if code is not None:
+        return _code_label(code, {})
+    return repr(callback)
+
+
+class Profiler:
+    """
+    Runtime profiling that can be switched on and off while the bot runs.
+
+    CPU: a thread samples the event loop thread's stack every sample_interval seconds,
+         written as collapsed stacks ("a;b;c count"), loadable by flamegraph.pl or speedscope.
+    Memory: tracemalloc snapshot at start and stop, the stop snapshot is dumped
+         (tracemalloc.Snapshot.load) together with the top allocation differences.
+    Slow callbacks: loop callbacks (task steps of bot handlers and commands) running
+         longer than slow_callback_ms, i.e. blocking the loop.
+    Reports go to logs/profiles/.
+    """
+
+    def __init__(self, sample_interval: float = 0.005, tracemalloc_frames: int = 10,
+                 slow_callback_ms: float = 50, top_allocations: int = 25, max_duration: float = 600):
+        self.sample_interval = max(0.001, float(sample_interval))
+        self.tracemalloc_frames = max(1, int(tracemalloc_frames))
+        self.slow_callback = float(slow_callback_ms) / 1000
+        self.top_allocations = int(top_allocations)
+        self.max_duration = float(max_duration)
+
+        self.running = False
+        self.started_at = None
+        self.samples = Counter()
+        self.slow_callbacks = []
+
+        self._loop_thread_id = None
+        self._sampler = None
+        self._stop_event = threading.Event()
+        self._baseline = None
+        self._own_tracemalloc = False
+        self._original_run = None
+        self._timer = None
+
+    ''' CPU sampling '''
+
+    def _sample_loop(self) -> None:
+        cache = {}
+        while not self._stop_event.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_code_label(frame.f_code, cache))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    ''' Slow callbacks '''
+
+    def _patch_handles(self) -> None:
+        # Time every loop callback, the same hook asyncio debug mode uses
+        profiler = self
+        original = self._original_run = asyncio.Handle._run
+
+        def timed_run(handle):
+            started = time.perf_counter()
+            try:
+                return original(handle)
+            finally:
+                duration = time.perf_counter() - started
+                if duration >= profiler.slow_callback:
+                    profiler.slow_callbacks.append((time.time(), duration, _callback_label(handle)))
+
+        asyncio.Handle._run = timed_run
+
+    def _unpatch_handles(self) -> None:
+        if self._original_run is not None:
+            asyncio.Handle._run = self._original_run
+            self._original_run = None
+
+    ''' Control '''
+
+    def start(self) -> bool:
+        # Returns False if already running, call from the event loop thread
+        if self.running:
+            return False
+
+        self.running = True
+        self.started_at = time.time()
+        self.samples = Counter()
+        self.slow_callbacks = []
+
+        self._loop_thread_id = threading.get_ident()
+        self._stop_event.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._sampler.start()
+
+        # Leave tracemalloc alone if someone else started it (e.g. python -X tracemalloc)
+        self._own_tracemalloc = not tracemalloc.is_tracing()
+        if self._own_tracemalloc:
+            tracemalloc.start(self.tracemalloc_frames)
+        self._baseline = tracemalloc.take_snapshot()
+
+        self._patch_handles()
+
+        # Safety net, a forgotten profiler stops by itself
+        if self.max_duration > 0:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_duration, lambda: asyncio.ensure_future(self.stop())
+            )
+
+        log_info("Profiling started")
+        return True
+
+    async def stop(self) -> list[Path]:
+        # Stop profiling and write reports, returns the written files
+        if not self.running:
+            return []
+
+        self.running = False
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        self._unpatch_handles()
+        self._stop_event.set()
+        await asyncio.to_thread(self._sampler.join)
+
+        try:
+            return await asyncio.to_thread(self._write_reports)
+        except Exception as e:
+            log_error("Failed to write profiling reports", exc=e)
+            return []
+        finally:
+            if self._own_tracemalloc:
+                tracemalloc.stop()
+            self._baseline = None
+
+    def status(self) -> str:
+        if not self.running:
+            return "Profiling is off"
+        return (
+            f"Profiling for {time.time() - self.started_at:.0f}s, "
+            f"{sum(self.samples.values())} CPU samples, "
+            f"{len(self.slow_callbacks)} slow callbacks"
+        )
+
+    ''' Reports '''
+
+    def _write_reports(self) -> list[Path]:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.fromtimestamp(self.started_at, timezone.utc).strftime("%Y%m%d-%H%M%S")
+        if SHARD is not None:
+            stamp = f"{stamp}-shard{SHARD}"
+        files = []
+
+        # CPU, collapsed stack format
+        cpu_path = PROFILE_DIR / f"cpu-{stamp}.collapsed"
+        with open(cpu_path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        files.append(cpu_path)
+
+        # Memory, raw snapshot plus top differences since start
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        snapshot_path = PROFILE_DIR / f"memory-{stamp}.tracemalloc"
+        snapshot.dump(str(snapshot_path))
+        files.append(snapshot_path)
+
+        top_path = PROFILE_DIR / f"memory-{stamp}.top.txt"
+        with open(top_path, "w", encoding="utf-8") as f:
+            current, peak = tracemalloc.get_traced_memory()
+            f.write(f"Traced memory: current {current} bytes, peak {peak} bytes\n")
+            f.write(f"Top {self.top_allocations} allocation differences since profiling started:\n")
+            for stat in snapshot.compare_to(self._baseline, "lineno")[:self.top_allocations]:
+                f.write(f"{stat}\n")
+        files.append(top_path)
+
+        # Slow callbacks, slowest first
+        slow_path = PROFILE_DIR / f"slow-{stamp}.txt"
+        with open(slow_path, "w", encoding="utf-8") as f:
+            f.write(f"Loop callbacks running {self.slow_callback * 1000:g}ms or longer\n")
+            for at, duration, label in sorted(self.slow_callbacks, key=lambda item: -item[1]):
+                when = datetime.fromtimestamp(at, timezone.utc).strftime("%H:%M:%S")
+                f.write(f"{when} {duration * 1000:.1f}ms {label}\n")
+        files.append(slow_path)
+
+        log_info(f"Profiling reports written to {PROFILE_DIR}")
+        return files
+
+
+profiler = Profiler(
+    sample_interval=profiling_cfg.get("sample_interval", 0.005),
+    tracemalloc_frames=profiling_cfg.get("tracemalloc_frames", 10),
+    slow_callback_ms=profiling_cfg.get("slow_callback_ms", 50),
+    top_allocations=profiling_cfg.get("top_allocations", 25),
+    max_duration=profiling_cfg.get("max_duration", 600),
+)
+
+
+async def toggle_profiling() -> None:
+    # Signal handler target, start or stop
+    if profiler.running:
+        await profiler.stop()
+    elif not profiler.start():
+        log_warning("Profiler already running")
@@ -0,0 +1,129 @@
+import asyncio
+import gzip
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from core.config import config, ROOT_DIR, LOGS_DIR
+from core.logger import log_info, log_error
+
+recording_cfg = config.get("recording", {})
+
+RECORDING_DIR = LOGS_DIR / "recordings"
+RECORDING_FORMAT = 1
+
+
+class TrafficRecorder:
+    """
+    Records raw inbound IRC lines for offline replay (benchmarks/replay.py).
+
+    File format, gzip compressed text:
+        first line: "# " + JSON header (format, nick, channels, server, started)
+        then one record per line: "<microseconds since previous record> <raw line>"
+    Timestamps come from the monotonic clock, so gaps replay exactly.
+    Lines are buffered and written by a background task in a worker thread.
+    """
+
+    def __init__(self, path: Path, header: dict, flush_interval: float = 1.0, batch_size: int = 500):
+        self.path = Path(path)
+        self.header = {"format": RECORDING_FORMAT, **header}
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self.lines = 0
+        self._buffer = []
+        self._last = None
+        self._file = None
+        self._task = None
+        self._wake = asyncio.Event()
+        self._closing = False
+
+    async def start(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = await asyncio.to_thread(gzip.open, self.path, "wt", encoding="utf-8")
+        self._buffer.append(f"# {json.dumps(self.header)}\n")
+        self._last = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+        log_info(f"Recording inbound traffic to {self.path}")
+
+    def record(self, line: str) -> None:
+        # Hot path, only a list append
+        now = time.monotonic()
+        self._buffer.append(f"{round((now - self._last) * 1_000_000)} {line}\n")
+        self._last = now
+        self.lines += 1
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    async def _write_buffer(self) -> None:
+        if not self._buffer:
+            return
+        data, self._buffer = "".join(self._buffer), []
+        await asyncio.to_thread(self._file.write, data)
+
+    async def _run(self) -> None:
+        try:
+            while not self._closing:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                await self._write_buffer()
+        except Exception as e:
+            log_error(f"Traffic recorder stopped: {self.path}", exc=e)
+
+    async def stop(self) -> None:
+        # Write the rest and close the file
+        if self._task is None:
+            return
+
+        self._closing = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+        try:
+            await self._write_buffer()
+        finally:
+            await asyncio.to_thread(self._file.close)
+        log_info(f"Recorded {self.lines} lines to {self.path}")
+
+
+def create_recorder(bot) -> TrafficRecorder | None:
+    # Recorder for one bot if [recording] enabled, None otherwise
+    if not recording_cfg.get("enabled", False):
+        return None
+
+    started = datetime.now(timezone.utc)
+    # Relative directories are relative to the project, not the working directory
+    directory = ROOT_DIR / recording_cfg.get("directory", RECORDING_DIR)
+    path = directory / f"{bot.name or 'default'}-{started:%Y%m%d-%H%M%S}.rec.gz"
+
+    return TrafficRecorder(
+        path,
+        header={
+            "nick": bot.base_nick,
+            "channels": bot.channels,
+            "server": bot.server,
+            "started": started.isoformat(timespec="seconds"),
+        },
+        flush_interval=float(recording_cfg.get("flush_interval", 1.0)),
+    )
+
+
+def read_recording(path: Path) -> tuple[dict, list[tuple[float, str]]]:
+    # Header and [(seconds since previous line, line), ...] of a recording
+    records = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header_line = f.readline()
+        if not header_line.startswith("# "):
+            raise ValueError(f"Not a traffic recording: {path}")
+        header = json.loads(header_line[2:])
+
+        for raw in f:
+            delta, _, line = raw.rstrip("\n").partition(" ")
+            records.append((int(delta) / 1_000_000, line))
+
+    return header, records
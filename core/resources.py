@@ -0,0 +1,65 @@
+import os
+import time
+from pathlib import Path
+
+from core.storage import read_json
+from core.logger import log_debug
+
+
+class ResourceCache:
+    """
+    In-memory cache for read-only JSON resources (facts, jokes, quotes).
+    A file is parsed once and only reloaded when its mtime changes,
+    the mtime itself is checked at most once per check_interval seconds.
+    """
+
+    def __init__(self, check_interval: float = 5.0):
+        self.check_interval = check_interval
+
+        # path -> [value, mtime_ns, last_checked]
+        self._entries = {}
+
+    async def get(self, path: Path, builder=None):
+        """
+        Return cached resource for path.
+        builder is an optional function that turns parsed JSON into a lookup structure,
+        its result is what gets cached and returned.
+        """
+        entry = self._entries.get(path)
+        now = time.monotonic()
+
+        # Fast path, no I/O while the entry is fresh
+        if entry and now - entry[2] < self.check_interval:
+            return entry[0]
+
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        if entry and entry[1] == mtime:
+            entry[2] = now
+            return entry[0]
+
+        # First load or file changed on disk
+        data = await read_json(path)
+        value = builder(data) if builder else data
+        self._entries[path] = [value, mtime, now]
+
+        log_debug(f"Loaded resource {path}")
+        return value
+
+    def invalidate(self, path: Path | None = None) -> None:
+        # Drop one or all cached resources
+        if path is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(path, None)
+
+
+# Shared cache used by all commands
+resource_cache = ResourceCache()
+
+
+async def get_resource(path: Path, builder=None):
+    return await resource_cache.get(path, builder)
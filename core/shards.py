@@ -0,0 +1,164 @@
+import asyncio
+import os
+import secrets
+import sys
+import time
+
+from core.config import config, networks, ROOT_DIR, SHARD
+from core.logger import log_info, log_warning
+from core.metrics import metrics
+from core.shared_state import SharedStateServer, SharedStateClient, RemoteNoteStore, RemoteChatLog
+from core.supervisor import BotSupervisor
+from utils.chat_logger import use_remote_chat_log
+import commands.note as note_module
+
+sharding_cfg = config.get("sharding", {})
+
+# Environment of a worker process, set by the coordinator
+ENV_SHARD = "IRC_BOT_SHARD"
+ENV_PORT = "IRC_BOT_SHARED_PORT"
+ENV_TOKEN = "IRC_BOT_SHARED_TOKEN"
+
+
+def shard_count(network_configs: list[dict] | None = None) -> int:
+    # Number of worker processes, 0 means no sharding (everything in this process)
+    network_configs = networks if network_configs is None else network_configs
+    if not sharding_cfg.get("enabled", False):
+        return 0
+
+    workers = int(sharding_cfg.get("workers", 0)) or os.cpu_count() or 1
+    count = min(workers, len(network_configs))
+    return count if count > 1 else 0
+
+
+def assign_shards(network_configs: list[dict], count: int) -> list[list[dict]]:
+    # Whole networks per shard (one connection each), balanced by channel count
+    shards = [[] for _ in range(count)]
+    loads = [0] * count
+
+    for net in sorted(network_configs, key=lambda net: -len(net["channels"])):
+        i = loads.index(min(loads))
+        shards[i].append(net)
+        loads[i] += len(net["channels"])
+    return shards
+
+
+class ShardCoordinator:
+    """
+    Runs the bot as several worker processes, each with its own event loop and a
+    share of the networks, so traffic is handled on more than one core.
+
+    The coordinator connects to no network itself. It is the single writer of the
+    chat log (with index and archive) and the note store, workers reach them through
+    a SharedStateServer on 127.0.0.1. Workers are main.py started again with the
+    shard number in the environment. A worker that exits is started again with
+    exponential backoff, the backoff starts over once a worker ran stable_after seconds.
+    """
+
+    def __init__(self, note_store, count: int, restart_initial_delay: float = 1,
+                 restart_max_delay: float = 60, stable_after: float = 60, stop_timeout: float = 10):
+        self.count = count
+        self.restart_initial_delay = float(restart_initial_delay)
+        self.restart_max_delay = float(restart_max_delay)
+        self.stable_after = float(stable_after)
+        self.stop_timeout = float(stop_timeout)
+
+        self.shards = assign_shards(networks, count)
+        self.server = SharedStateServer(note_store, secrets.token_hex(16), self.shards)
+        self.processes = {}
+
+        metrics.add_gauge("bot_shards_running", lambda: [((), sum(
+            process.returncode is None for process in self.processes.values()
+        ))])
+
+    async def _spawn(self, shard: int) -> asyncio.subprocess.Process:
+        env = {
+            **os.environ,
+            ENV_SHARD: str(shard),
+            ENV_PORT: str(self.server.port),
+            ENV_TOKEN: self.server.token,
+        }
+        return await asyncio.create_subprocess_exec(sys.executable, str(ROOT_DIR / "main.py"), cwd=ROOT_DIR, env=env)
+
+    async def _supervise(self, shard: int) -> None:
+        names = ", ".join(net["name"] for net in self.shards[shard])
+        attempt = 0
+
+        while True:
+            started = time.monotonic()
+            process = self.processes[shard] = await self._spawn(shard)
+            log_info(f"Shard {shard} started (pid {process.pid}): {names}")
+
+            code = await process.wait()
+            runtime = time.monotonic() - started
+            if runtime >= self.stable_after:
+                attempt = 0
+
+            delay = min(self.restart_max_delay, self.restart_initial_delay * (2 ** attempt))
+            attempt += 1
+            metrics.inc("bot_shard_restarts_total", 1, (("shard", str(shard)),))
+            log_warning(f"Shard {shard} exited with code {code} after {runtime:.0f}s, restarting in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _stop_workers(self) -> None:
+        running = [process for process in self.processes.values() if process.returncode is None]
+        for process in running:
+            process.terminate()
+
+        # Workers flush and close their connections, kill the ones that hang
+        try:
+            await asyncio.wait_for(asyncio.gather(*(process.wait() for process in running)), self.stop_timeout)
+        except asyncio.TimeoutError:
+            for process in running:
+                if process.returncode is None:
+                    log_warning(f"Shard process {process.pid} did not stop, killing it")
+                    process.kill()
+            await asyncio.gather(*(process.wait() for process in running))
+
+    def forward_signal(self, signum: int) -> None:
+        # SIGHUP (reload) and SIGUSR2 (profiling) apply to every worker
+        for process in self.processes.values():
+            if process.returncode is None:
+                process.send_signal(signum)
+
+    async def run(self) -> None:
+        await self.server.start()
+        log_info(f"Running {sum(map(len, self.shards))} network connection(s) in {self.count} shard processes")
+
+        try:
+            await asyncio.gather(*(self._supervise(shard) for shard in range(self.count)))
+        finally:
+            # Workers first, their last chat lines and notes still go through the server
+            await self._stop_workers()
+            await self.server.stop()
+
+
+def create_coordinator(count: int) -> ShardCoordinator:
+    return ShardCoordinator(
+        note_module.note_store,
+        count,
+        restart_initial_delay=sharding_cfg.get("restart_initial_delay", 1),
+        restart_max_delay=sharding_cfg.get("restart_max_delay", 60),
+        stable_after=sharding_cfg.get("stable_after", 60),
+        stop_timeout=sharding_cfg.get("stop_timeout", 10),
+    )
+
+
+''' Worker side '''
+
+async def connect_worker() -> tuple[SharedStateClient, BotSupervisor]:
+    """
+    Connect a worker process to its coordinator, route notes and chat log there
+    and build the bots of this shard. Exit the worker when client.closed is set.
+    """
+    client = SharedStateClient("127.0.0.1", int(os.environ[ENV_PORT]), os.environ[ENV_TOKEN])
+    await client.connect()
+
+    note_module.note_store = RemoteNoteStore(client)
+    use_remote_chat_log(RemoteChatLog(client))
+
+    # Networks come from the coordinator, so a restarted worker takes the same share
+    # even if config.toml was edited in the meantime
+    supervisor = BotSupervisor(await client.call("networks", SHARD))
+    supervisor.build_bots()
+    return client, supervisor
@@ -0,0 +1,275 @@
+import asyncio
+import hmac
+import itertools
+import json
+
+from core.logger import log_info, log_warning, log_error, log_debug
+from utils.chat_logger import ChatLogUnavailable, chat_grep, chat_last_seen, write_chat_lines
+
+# Longest message line, grep results and chat batches can be large
+MAX_LINE = 16 * 1024 * 1024
+
+# NoteStore methods workers may call
+NOTE_METHODS = ("read", "count", "add", "wipe", "read_page", "search", "by_author")
+
+
+class SharedStateError(RuntimeError):
+    # Request failed in the coordinator
+    pass
+
+
+def _encode(message: dict) -> bytes:
+    return (json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n").encode()
+
+
+class SharedStateServer:
+    """
+    Single writer for state the shard workers share, runs in the coordinator.
+
+    Workers connect over a local TCP socket and send JSON lines:
+        {"token": ...}                                  first line, closes on mismatch
+        {"op": "chat", "args": [lines]}                 chat log lines, no reply
+        {"id": n, "op": "note", "args": [method, ...]}  NoteStore call
+        {"id": n, "op": "seen", "args": [nick, network]}
+        {"id": n, "op": "grep", "args": [term, limit, options]}
+        {"id": n, "op": "networks", "args": [shard]}    network configs of a shard
+    and get {"id": n, "result": ...} or {"id": n, "error": ..., "unavailable": bool} back.
+    Requests of one worker run concurrently, the note store and chat log
+    serialize writes themselves.
+    """
+
+    def __init__(self, note_store, token: str, shard_networks: list[list[dict]], host: str = "127.0.0.1"):
+        self.note_store = note_store
+        self.token = token
+        self.shard_networks = shard_networks
+        self.host = host
+        self.port = None
+        self._server = None
+        self._connections = set()
+
+    async def start(self) -> int:
+        # Returns the bound port
+        self._server = await asyncio.start_server(self._handle_client, self.host, 0, limit=MAX_LINE)
+        self.port = self._server.sockets[0].getsockname()[1]
+        log_info(f"Shared state service on {self.host}:{self.port}")
+        return self.port
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _call(self, op: str, args: list):
+        if op == "note":
+            method, *args = args
+            if method not in NOTE_METHODS:
+                raise SharedStateError(f"Unknown note method: {method}")
+            return await getattr(self.note_store, method)(*args)
+
+        if op == "seen":
+            return await chat_last_seen(*args)
+
+        if op == "grep":
+            term, limit, options = args
+            return await chat_grep(term, limit, **options)
+
+        if op == "networks":
+            return self.shard_networks[args[0]]
+
+        raise SharedStateError(f"Unknown operation: {op}")
+
+    async def _reply(self, writer, request: dict) -> None:
+        try:
+            reply = {"id": request["id"], "result": await self._call(request["op"], request.get("args", []))}
+        except ChatLogUnavailable as e:
+            reply = {"id": request["id"], "error": str(e), "unavailable": True}
+        except Exception as e:
+            log_error(f"Shared state request {request.get('op')} failed", exc=e)
+            reply = {"id": request["id"], "error": str(e)}
+
+        if not writer.is_closing():
+            writer.write(_encode(reply))
+
+    async def _handle_client(self, reader, writer) -> None:
+        self._connections.add(writer)
+        tasks = set()
+        try:
+            hello = json.loads(await reader.readline() or b"{}")
+            if not hmac.compare_digest(str(hello.get("token", "")), self.token):
+                log_warning("Shared state connection with a wrong token closed")
+                return
+
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+
+                request = json.loads(raw)
+                if request["op"] == "chat":
+                    # Fire and forget, order is kept because lines are queued right here
+                    write_chat_lines(request["args"][0])
+                    continue
+
+                task = asyncio.create_task(self._reply(writer, request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+                # Let replies go out before reading more from a busy worker
+                await writer.drain()
+
+        except (ConnectionError, ValueError) as e:
+            log_debug("Shared state connection closed: %s", e)
+
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._connections.discard(writer)
+            writer.close()
+
+
+class SharedStateClient:
+    """
+    Connection of a shard worker to the coordinator's SharedStateServer.
+    call() waits for the reply, send() does not. A lost connection is fatal,
+    closed is set and the worker is expected to exit and be restarted.
+    """
+
+    def __init__(self, host: str, port: int, token: str):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.closed = asyncio.Event()
+
+        self._reader = None
+        self._writer = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._task = None
+
+    async def connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=MAX_LINE)
+        self._writer.write(_encode({"token": self.token}))
+        self._task = asyncio.create_task(self._read_replies())
+
+    async def close(self) -> None:
+        if self._writer:
+            self._writer.close()
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _read_replies(self) -> None:
+        try:
+            while True:
+                raw = await self._reader.readline()
+                if not raw:
+                    break
+
+                reply = json.loads(raw)
+                future = self._pending.pop(reply["id"], None)
+                if future is None or future.done():
+                    continue
+
+                if "error" not in reply:
+                    future.set_result(reply["result"])
+                elif reply.get("unavailable"):
+                    future.set_exception(ChatLogUnavailable(reply["error"]))
+                else:
+                    future.set_exception(SharedStateError(reply["error"]))
+
+        except (ConnectionError, ValueError) as e:
+            log_warning(f"Lost connection to the shard coordinator: {e}")
+
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Shard coordinator connection closed"))
+            self._pending.clear()
+            self.closed.set()
+
+    def send(self, op: str, *args) -> None:
+        if self.closed.is_set():
+            raise ConnectionError("Shard coordinator connection closed")
+        self._writer.write(_encode({"op": op, "args": args}))
+
+    async def call(self, op: str, *args):
+        if self.closed.is_set():
+            raise ConnectionError("Shard coordinator connection closed")
+
+        request_id = next(self._ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+        self._writer.write(_encode({"id": request_id, "op": op, "args": args}))
+        await self._writer.drain()
+        return await future
+
+
+class RemoteNoteStore:
+    # NoteStore interface of commands/note.py, served by the coordinator
+
+    def __init__(self, client: SharedStateClient):
+        self.client = client
+
+    async def read(self, name: str) -> list[dict]:
+        return await self.client.call("note", "read", name)
+
+    async def count(self, name: str) -> int:
+        return await self.client.call("note", "count", name)
+
+    async def add(self, name: str, note: dict, max_notes: int | None = None) -> bool:
+        return await self.client.call("note", "add", name, note, max_notes)
+
+    async def wipe(self, name: str) -> None:
+        await self.client.call("note", "wipe", name)
+
+    async def read_page(self, name: str, page: int, page_size: int) -> tuple[list[dict], int]:
+        return tuple(await self.client.call("note", "read_page", name, page, page_size))
+
+    async def search(self, name: str, terms: list[str], page: int, page_size: int) -> tuple[list[dict], int]:
+        return tuple(await self.client.call("note", "search", name, terms, page, page_size))
+
+    async def by_author(self, name: str, user: str, page: int, page_size: int) -> tuple[list[dict], int]:
+        return tuple(await self.client.call("note", "by_author", name, user, page, page_size))
+
+
+class RemoteChatLog:
+    """
+    Chat log sink interface of utils/chat_logger.py, served by the coordinator.
+    Lines put during one loop iteration are sent as one message.
+    """
+
+    def __init__(self, client: SharedStateClient):
+        self.client = client
+        self.index = None
+        self._buffer = []
+
+    @property
+    def running(self) -> bool:
+        return True
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        self._flush()
+
+    def put(self, line: str) -> None:
+        self._buffer.append(line)
+        if len(self._buffer) == 1:
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        try:
+            self.client.send("chat", lines)
+        except ConnectionError:
+            log_debug("Dropped %d chat log lines, coordinator is gone", len(lines))
+
+    async def last_seen(self, nick: str, network: str = "") -> list[tuple]:
+        return [tuple(entry) for entry in await self.client.call("seen", nick, network)]
+
+    async def grep(self, term: str, limit: int, **options) -> list[tuple]:
+        return [tuple(result) for result in await self.client.call("grep", term, limit, options)]
@@ -1,9 +1,32 @@
+import asyncio
 import json
+import os
 import aiofiles
 from pathlib import Path
 from json import JSONDecodeError
 
-from core.logger import log_error
+from core.config import config
+from core.logger import log_error, log_debug
+
+storage_cfg = config.get("storage", {})
+
+
+def _dumps(data) -> str:
+    # Compact, the files are read by the bot and not by people
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    # Temp file in the same directory, fsync, then rename over the old file.
+    # A crash leaves either the old or the new content, never a partial file.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
 
 async def read_json(path: Path):
     """
@@ -30,23 +53,103 @@ async def read_json(path: Path):
         raise
 
 
-async def write_json(path: Path, data) -> None:
+class JsonStore:
     """
-    Write data as formatted JSON to a file.
+    Write-back cache for JSON state files.
+    get() reads a file once and serves it from memory afterwards, set() only updates
+    memory and schedules a flush flush_delay seconds later, so a burst of writes to
+    one file becomes a single atomic write. flush_all() writes everything pending,
+    call it on shutdown.
     """
-    try:
-        async with aiofiles.open(path, "w", encoding="utf-8") as f:
-            await f.write(
-                json.dumps(data, ensure_ascii=False, indent=4)
-            )
 
-    except Exception as e:
-        log_error(f"Failed to write JSON file {path}", exc=e)
-        raise
+    def __init__(self, flush_delay: float = 2.0):
+        self.flush_delay = max(0.0, float(flush_delay))
 
+        # path -> cached data
+        self._data = {}
+        self._dirty = set()
+        self._timers = {}
+        self._locks = {}
 
-async def wipe_json(path: Path) -> None:
-    """
-    Clear a JSON file by writing an empty list.
-    """
-    await write_json(path, [])
+    def _lock(self, path: Path) -> asyncio.Lock:
+        lock = self._locks.get(path)
+        if lock is None:
+            lock = self._locks[path] = asyncio.Lock()
+        return lock
+
+    async def get(self, path: Path, default=None):
+        """
+        Cached data for path, read from disk on first use.
+        A missing or empty file returns default (an empty list if not given).
+        Callers that change the returned object must pass it to set() afterwards.
+        """
+        path = Path(path)
+        if path in self._data:
+            return self._data[path]
+
+        async with self._lock(path):
+            # Another task may have loaded it while we waited
+            if path not in self._data:
+                data = await read_json(path)
+                if data == [] and default is not None:
+                    data = default
+                self._data[path] = data
+            return self._data[path]
+
+    def set(self, path: Path, data) -> None:
+        # Update memory now, write to disk after the debounce window
+        path = Path(path)
+        self._data[path] = data
+        self._dirty.add(path)
+
+        if path not in self._timers:
+            self._timers[path] = asyncio.get_running_loop().create_task(self._flush_later(path))
+
+    async def _flush_later(self, path: Path) -> None:
+        try:
+            await asyncio.sleep(self.flush_delay)
+        finally:
+            self._timers.pop(path, None)
+
+        try:
+            await self.flush(path)
+        except Exception:
+            # Already logged, the path stays dirty for the next flush
+            pass
+
+    async def flush(self, path: Path) -> None:
+        # Write path now if it has unsaved changes
+        path = Path(path)
+        async with self._lock(path):
+            if path not in self._dirty:
+                return
+
+            # Serialize before the write so later set() calls are not half included
+            self._dirty.discard(path)
+            text = _dumps(self._data[path])
+            try:
+                await asyncio.to_thread(_write_atomic, path, text)
+            except Exception as e:
+                # Keep it dirty, the next flush tries again
+                self._dirty.add(path)
+                log_error(f"Failed to write JSON file {path}", exc=e)
+                raise
+
+    async def flush_all(self) -> None:
+        for timer in list(self._timers.values()):
+            timer.cancel()
+        self._timers.clear()
+
+        if self._dirty:
+            log_debug(f"Flushing {len(self._dirty)} JSON file(s)")
+        results = await asyncio.gather(*(self.flush(path) for path in list(self._dirty)), return_exceptions=True)
+        if any(isinstance(result, Exception) for result in results):
+            log_error("Some JSON files could not be written on shutdown")
+
+
+# Shared store, flushed on shutdown by main
+json_store = JsonStore(flush_delay=storage_cfg.get("flush_delay", 2.0))
+
+
+async def flush_storage() -> None:
+    await json_store.flush_all()
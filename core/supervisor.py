@@ -0,0 +1,51 @@
+import asyncio
+
+from core.config import networks
+from core.logger import log_info, log_error
+from core.bot import IRCBot
+
+
+class BotSupervisor:
+    """
+    Run one IRCBot per configured network on a single event loop.
+    All bots share the command registry, resource caches, storage and logging.
+    """
+
+    def __init__(self, network_configs: list[dict] | None = None):
+        self.network_configs = network_configs if network_configs is not None else networks
+        self.bots = []
+
+    def build_bots(self) -> list[IRCBot]:
+        self.bots = [
+            IRCBot(
+                server=net["server"],
+                port=net["port"],
+                nickname=net["nickname"],
+                alt_nickname=net["alt_nickname"],
+                channels=net["channels"],
+                use_ssl=net["use_ssl"],
+                name=net["name"],
+                sasl_username=net["sasl_username"],
+                sasl_password=net["sasl_password"],
+            )
+            for net in self.network_configs
+        ]
+        return self.bots
+
+    async def _run_bot(self, bot: IRCBot) -> None:
+        # One bot failing must not take the other networks down
+        try:
+            await bot.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log_error(f"{bot.log_tag}Bot stopped with error", exc=e)
+        else:
+            log_info(f"{bot.log_tag}Bot stopped")
+
+    async def run(self) -> None:
+        if not self.bots:
+            self.build_bots()
+
+        log_info(f"Running {len(self.bots)} network connection(s)")
+        await asyncio.gather(*(self._run_bot(bot) for bot in self.bots))
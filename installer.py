@@ -1,4 +1,5 @@
 from pathlib import Path
+import sys
 import tomlkit
 
 # Paths
@@ -15,30 +16,124 @@ DEFAULT_CONFIG = {
         "channel": "#examplechannel",
         "nickname": "examplebot",
         "use_ssl": True,
+        "sasl_username": "",
+        "sasl_password": "",
+    },
+    "caps": {
+        "enabled": True,
+        "request": ["server-time", "message-tags", "batch", "echo-message", "cap-notify"],
+        "sasl_required": False,
     },
     "bot": {
         "command_prefix": "!",
         "allow_whispers": False,
+        "admins": [],
+    },
+    "flood": {
+        "send_rate": 2.0,
+        "send_burst": 5,
+        "max_batch_lines": 5,
+        "max_queue_lines": 1000,
+        "merge_replies": True,
+    },
+    "rate_limit": {
+        "enabled": True,
+        "user_rate": 0.2,
+        "user_burst": 5,
+        "channel_rate": 1.0,
+        "channel_burst": 10,
+        "command_rate": 2.0,
+        "command_burst": 20,
+        "max_keys": 5000,
+        "cooldown_notice": True,
+    },
+    "reconnect": {
+        "initial_delay": 2,
+        "max_delay": 300,
+        "read_timeout": 300,
+        "ping_interval": 120,
+    },
+    "dispatch": {
+        "max_concurrent_commands": 8,
+        "command_timeout": 10,
+        "process_workers": 2,
+        "process_max_result_bytes": 4096,
+    },
+    "storage": {
+        "flush_delay": 2.0,
     },
     "notes": {
         "max_notes": 50,
         "max_note_length": 200,
+        "compact_threshold": 100,
+        "page_size": 5,
     },
     "logging": {
         "console_level": "INFO",
         "file_level": "DEBUG",
+        "log_max_bytes": 10485760,
+        "log_backup_count": 5,
+        "log_rotate_when": "",
+        "log_compress": True,
         "chat_log_enabled": True,
+        "chat_log_batch_size": 100,
+        "chat_log_flush_interval": 1.0,
+        "chat_log_archive_enabled": True,
+        "chat_log_segment_max_bytes": 16777216,
+        "chat_log_segment_max_age": 86400,
+        "chat_log_retention_days": 0,
+        "chat_log_retention_max_bytes": 0,
+        "chat_index_enabled": True,
+        "chat_index_block_size": 65536,
+        "chat_index_save_interval": 60,
+        "chat_grep_max_results": 5,
+        "chat_grep_max_bytes": 16777216,
+    },
+    "metrics": {
+        "enabled": True,
+        "loop_lag_interval": 1.0,
+        "http_enabled": False,
+        "http_host": "127.0.0.1",
+        "http_port": 9108,
+    },
+    "profiling": {
+        "sample_interval": 0.005,
+        "tracemalloc_frames": 10,
+        "slow_callback_ms": 50,
+        "top_allocations": 25,
+        "max_duration": 600,
+    },
+    "recording": {
+        "enabled": False,
+        "directory": "logs/recordings",
+        "flush_interval": 1.0,
+    },
+    "sharding": {
+        "enabled": False,
+        "workers": 0,
+        "restart_initial_delay": 1,
+        "restart_max_delay": 60,
+        "stable_after": 60,
+        "stop_timeout": 10,
     },
     "commands": {
         "help": True,
         "roll": True,
+        "dice": True,
         "note_add": True,
         "note_read": True,
+        "note_search": True,
+        "note_from": True,
         "note_wipe": True,
         "funfact": True,
         "quote": True,
         "flip": True,
-        "joke": True
+        "joke": True,
+        "seen": True,
+        "grep": True,
+        "reload": True,
+        "stats": True,
+        "profile": True
     }
 }
 
@@ -58,6 +153,10 @@ def create_config():
 
 
 def main():
+    # The bot reads config.toml with tomllib and relies on Task.cancelling()
+    if sys.version_info < (3, 11):
+        sys.exit("Python 3.11 or newer is required")
+
     print("Setting up IRC Bot environment...")
     create_dirs()
     create_config()
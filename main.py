@@ -1,34 +1,170 @@
 import asyncio
-from core.config import config
+import signal
+from core.config import get_settings, reload_config, SHARD
 from core.logger import log_info, log_error
-from core.bot import IRCBot
+from core.supervisor import BotSupervisor
+from core.metrics import start_metrics, stop_metrics
+from core.profiler import profiler, toggle_profiling
+from core.process_pool import start_command_pool, stop_command_pool
+from core.shards import shard_count, create_coordinator, connect_worker
+from core.storage import flush_storage
+from commands.registry import COMMANDS
+from utils.chat_logger import start_chat_logger, stop_chat_logger
+
+# Set while this process coordinates shard workers
+coordinator = None
+
+
+def handle_sighup():
+    # Reload config.toml on SIGHUP, keep old settings if it is invalid
+    try:
+        reload_config()
+        log_info("Config reloaded (SIGHUP)")
+    except Exception as e:
+        log_error("Config reload failed: ", exc=e)
+
+    if coordinator:
+        coordinator.forward_signal(signal.SIGHUP)
+
+
+def handle_sigusr2():
+    # Start or stop profiling on SIGUSR2
+    asyncio.ensure_future(toggle_profiling())
+
+    if coordinator:
+        coordinator.forward_signal(signal.SIGUSR2)
+
+
+def add_signal_handlers():
+    # SIGHUP, SIGUSR2 and SIGTERM handlers are not available on Windows
+    loop = asyncio.get_running_loop()
+    if hasattr(signal, "SIGHUP"):
+        loop.add_signal_handler(signal.SIGHUP, handle_sighup)
+    if hasattr(signal, "SIGUSR2"):
+        loop.add_signal_handler(signal.SIGUSR2, handle_sigusr2)
+
+    # Coordinator and shard workers stop cleanly on SIGTERM
+    if coordinator or SHARD is not None:
+        try:
+            loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass
+
+
+async def run_coordinator(count: int):
+    global coordinator
+    coordinator = create_coordinator(count)
+    add_signal_handlers()
+
+    # The coordinator writes the chat log and notes for all shards
+    await start_chat_logger()
+    await start_metrics()
+
+    try:
+        await coordinator.run()
+
+    except asyncio.CancelledError:
+        log_info("Shard coordinator stopped.")
+
+    except Exception as e:
+        log_error(f"Unexpected error in shard coordinator", exc=e)
+
+    finally:
+        await stop_chat_logger()
+        await stop_metrics()
+        await profiler.stop()
+        await flush_storage()
+
+
+async def run_shard():
+    # Ctrl+C reaches the whole process group, the coordinator stops the workers in order
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    add_signal_handlers()
+
+    try:
+        client, supervisor = await connect_worker()
+
+    except Exception as e:
+        log_error(f"Shard {SHARD} failed to start", exc=e)
+        return
+
+    await start_metrics()
+    await start_command_pool(COMMANDS, get_settings().enabled_commands)
+
+    try:
+        # Without the coordinator there is nowhere to log or store notes
+        bots = asyncio.create_task(supervisor.run())
+        lost = asyncio.create_task(client.closed.wait())
+        await asyncio.wait((bots, lost), return_when=asyncio.FIRST_COMPLETED)
+        if lost.done():
+            log_error(f"Shard {SHARD} lost its coordinator, stopping")
+
+    except asyncio.CancelledError:
+        log_info(f"Shard {SHARD} stopped.")
+
+    except Exception as e:
+        log_error(f"Unexpected error in shard {SHARD}", exc=e)
+
+    finally:
+        for task in (bots, lost):
+            task.cancel()
+        await asyncio.gather(bots, lost, return_exceptions=True)
+
+        # Last chat log lines go to the coordinator before the connection closes
+        await stop_chat_logger()
+        await stop_metrics()
+        await stop_command_pool()
+        await profiler.stop()
+        await flush_storage()
+        await client.close()
 
 
 async def main():
+    if SHARD is not None:
+        await run_shard()
+        return
+
+    count = shard_count()
+    if count:
+        log_info(f"Starting IRC bot with {count} shards...")
+        await run_coordinator(count)
+        return
+
     log_info("Starting IRC bot...")
+    add_signal_handlers()
 
     try:
-        bot = IRCBot(
-            server=config["irc"]["server"],
-            port=int(config["irc"]["port"]),
-            nickname=config["irc"]["nickname"],
-            channel=config["irc"]["channel"],
-            cmd_prefix=config["bot"].get("command_prefix", "!"),  # fallback if not set
-            use_ssl=config["irc"]["use_ssl"]
-        )
+        supervisor = BotSupervisor()
+        supervisor.build_bots()
         
     except Exception as e:
         log_error(f"Failed to initialize bot", exc=e)
         return
 
+    await start_chat_logger()
+    await start_metrics()
+    await start_command_pool(COMMANDS, get_settings().enabled_commands)
+
     try:
-        await bot.run()
+        await supervisor.run()
         
     except KeyboardInterrupt:
         log_info("Bot stopped manually.")
         
     except Exception as e:
         log_error(f"Unexpected error in main", exc=e)
+    
+    finally:
+        # Flush pending chat log lines
+        await stop_chat_logger()
+        await stop_metrics()
+        await stop_command_pool()
+        
+        # Write reports of a profiling run that is still on
+        await profiler.stop()
+        
+        # Write pending JSON state before exit
+        await flush_storage()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+# Segmented, compressed chat log archive
+
+import asyncio
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from core.logger import log_error, log_info, log_warning
+from core.storage import json_store
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _line_timestamp(line: bytes) -> str | None:
+    # Chat log lines start with "YYYY-mm-dd HH:MM:SS | "
+    timestamp = line[:19].decode("ascii", errors="replace")
+    try:
+        datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+    return timestamp
+
+
+def first_line_time(path: Path) -> float | None:
+    # Epoch time of the first line in a log file, None if empty or unreadable
+    try:
+        with open(path, "rb") as f:
+            timestamp = _line_timestamp(f.readline())
+    except FileNotFoundError:
+        return None
+
+    if timestamp is None:
+        return None
+    return datetime.strptime(timestamp, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+
+
+class ChatArchive:
+    """
+    Closed chat log segments, gzip compressed, listed in manifest.json:
+        {"segments": [{"file", "start", "end", "lines", "bytes", "size"}, ...]}  oldest first
+    start/end are the first and last line timestamps, bytes the uncompressed size
+    and size the compressed size on disk.
+
+    The chat log writer decides when to rotate (segment size or age) and renames the
+    active log into the archive directory. Compression, manifest updates and retention
+    run in a worker thread, the manifest is written through the shared JSON store.
+    """
+
+    def __init__(self, archive_dir: Path, segment_max_bytes: int = 16 * 1024 * 1024,
+                 segment_max_age: float = 86400, retention_days: float = 0, retention_max_bytes: int = 0):
+        self.archive_dir = Path(archive_dir)
+        self.manifest_path = self.archive_dir / "manifest.json"
+        self.segment_max_bytes = int(segment_max_bytes)
+        self.segment_max_age = float(segment_max_age)
+        self.retention_days = float(retention_days)
+        self.retention_max_bytes = int(retention_max_bytes)
+
+        self.segments = []
+        self.segment_started = None     # epoch time of the active segment's first line
+
+        # One archive run at a time, so manifest snapshots are written in order
+        self._lock = asyncio.Lock()
+        self._tasks = set()
+
+    ''' Active segment '''
+
+    def open_segment(self, log_path: Path) -> None:
+        # Called when the writer opens the active log
+        self.segment_started = first_line_time(log_path)
+
+    def should_rotate(self, log_size: int, batch_size: int) -> bool:
+        # Checked before each batch is written, an empty log is never rotated
+        if not log_size:
+            return False
+
+        if self.segment_max_bytes and log_size + batch_size > self.segment_max_bytes:
+            return True
+
+        if self.segment_max_age and self.segment_started is not None:
+            return time.time() - self.segment_started >= self.segment_max_age
+
+        return False
+
+    def rotate(self, log_path: Path) -> None:
+        """
+        Move the closed active log into the archive and compress it in the background.
+        The writer must have closed the file, the next write creates a new log.
+        """
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+
+        started = datetime.fromtimestamp(self.segment_started or time.time(), timezone.utc)
+        name = f"chat-{started:%Y%m%d-%H%M%S}"
+        target = self.archive_dir / f"{name}.log"
+        counter = 1
+        while target.exists() or target.with_suffix(".log.gz").exists():
+            target = self.archive_dir / f"{name}-{counter}.log"
+            counter += 1
+
+        os.replace(log_path, target)
+        self.segment_started = None
+        self._start_archiving([target])
+
+    def note_write(self) -> None:
+        # First line of a new segment starts its age
+        if self.segment_started is None:
+            self.segment_started = time.time()
+
+    ''' Background work '''
+
+    def _start_archiving(self, paths: list[Path]) -> None:
+        task = asyncio.get_running_loop().create_task(self._archive(paths))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _archive(self, paths: list[Path]) -> None:
+        try:
+            async with self._lock:
+                await asyncio.to_thread(self._archive_sync, paths)
+
+                # Written right away, a segment missing from the manifest is never searched or expired
+                json_store.set(self.manifest_path, {"segments": list(self.segments)})
+                await json_store.flush(self.manifest_path)
+        except Exception as e:
+            log_error("Chat log archiving failed", exc=e)
+
+    def _archive_sync(self, paths: list[Path]) -> None:
+        for path in paths:
+            self.segments.append(self._compress(path))
+        self._apply_retention()
+
+    def _compress(self, path: Path) -> dict:
+        # Stream the segment through gzip, counting lines and keeping first/last timestamps
+        gz_path = path.with_suffix(".log.gz")
+        tmp_path = gz_path.with_suffix(".gz.tmp")
+        start = end = None
+        lines = 0
+        raw_bytes = 0
+
+        with open(path, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+            for line in src:
+                dst.write(line)
+                lines += 1
+                raw_bytes += len(line)
+                timestamp = _line_timestamp(line)
+                if timestamp:
+                    start = start or timestamp
+                    end = timestamp
+
+        os.replace(tmp_path, gz_path)
+        os.remove(path)
+
+        size = gz_path.stat().st_size
+        log_info(f"Archived chat log segment {gz_path.name} ({raw_bytes} -> {size} bytes)")
+        return {"file": gz_path.name, "start": start, "end": end, "lines": lines, "bytes": raw_bytes, "size": size}
+
+    def _apply_retention(self) -> None:
+        keep = list(self.segments)
+
+        if self.retention_days > 0:
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=self.retention_days)).strftime(TIMESTAMP_FORMAT)
+            keep = [segment for segment in keep if (segment["end"] or "") >= cutoff]
+
+        if self.retention_max_bytes > 0:
+            total = sum(segment["size"] for segment in keep)
+            while keep and total > self.retention_max_bytes:
+                total -= keep.pop(0)["size"]
+
+        for segment in self.segments:
+            if segment not in keep:
+                try:
+                    os.remove(self.archive_dir / segment["file"])
+                except FileNotFoundError:
+                    pass
+                log_info(f"Removed chat log segment {segment['file']} (retention)")
+
+        self.segments = keep
+
+    def load(self) -> None:
+        """
+        Read the manifest and find segments a crash left uncompressed.
+        Blocking, run in a thread.
+        """
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.segments = json.load(f)["segments"]
+        except FileNotFoundError:
+            self.segments = []
+        except (OSError, ValueError, KeyError) as e:
+            log_warning(f"Chat archive manifest unreadable, starting a new one: {e}")
+            self.segments = []
+
+        # Drop entries whose files were removed by hand
+        self.segments = [s for s in self.segments if (self.archive_dir / s["file"]).exists()]
+
+    async def start(self) -> None:
+        await asyncio.to_thread(self.load)
+
+        # Renamed but not compressed yet (stopped in between)
+        leftovers = sorted(self.archive_dir.glob("chat-*.log")) if self.archive_dir.exists() else []
+        if leftovers:
+            self._start_archiving(leftovers)
+
+    async def stop(self) -> None:
+        # Wait for running compressions, they are not interrupted
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    ''' Reading '''
+
+    def segment_paths(self) -> list[tuple[dict, Path]]:
+        # Archived segments newest first
+        return [(segment, self.archive_dir / segment["file"]) for segment in reversed(list(self.segments))]
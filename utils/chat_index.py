@@ -0,0 +1,314 @@
+# Chat log index for seen and grep lookups
+
+import asyncio
+import gzip
+import json
+import mmap
+import os
+import time
+from collections import deque
+from pathlib import Path
+
+import aiofiles
+
+from core.logger import log_warning
+from core.storage import json_store
+from utils.text import sanitize_text
+
+# Longest message kept per nick in the seen table
+SEEN_MESSAGE_LENGTH = 100
+
+FIELD_SEPARATOR = " | "
+
+
+def network_field(network: str | None) -> str:
+    # Network as written to the log, "" for the single [irc] network
+    return sanitize_text(network) if network else ""
+
+
+def parse_log_line(line: str) -> list[str] | None:
+    # "timestamp | [network | ]location | user | message" -> fields with network ("" if
+    # missing), None for broken lines. Messages are sanitized and never contain " | "
+    fields = line.rstrip("\n").split(FIELD_SEPARATOR, 4)
+    if len(fields) == 4:
+        fields.insert(1, "")
+    return fields if len(fields) == 5 else None
+
+
+def _seen_key(nick: str, network: str) -> str:
+    # "@" is not valid in nicks, keys of the single [irc] network are the plain nick
+    return f"{nick.lower()}@{network}" if network else nick.lower()
+
+
+def _seen_entries(value: list) -> list[tuple]:
+    # Tables saved before entries were kept per channel hold a single entry
+    if value and isinstance(value[0], str):
+        return [tuple(value)]
+    return [tuple(entry) for entry in value]
+
+
+class ChatIndex:
+    """
+    Index kept next to the chat log, fed by the chat log writer after each batch.
+
+    Seen table: nick (per network) -> last log line of that nick in every channel (and PM),
+    newest first, saved to a JSON file together with
+    the log offset it covers, so startup only reads the log written after the last save.
+
+    Offset index: (timestamp, byte offset) of the first line in every block_size bytes
+    of the active log, reset when the log is rotated into the archive. grep walks these
+    line aligned blocks newest first through mmap and stops as soon as it has enough
+    results, memory use does not grow with the log.
+    """
+
+    def __init__(self, log_path: Path, block_size: int = 65536, save_interval: float = 60.0):
+        self.log_path = Path(log_path)
+        self.index_path = self.log_path.with_suffix(".idx")
+        self.seen_path = self.log_path.with_name(f"{self.log_path.stem}_seen.json")
+        self.block_size = max(4096, int(block_size))
+        self.save_interval = save_interval
+
+        self.seen = {}
+        self.entries = []   # [(timestamp, offset), ...] ascending
+        self.offset = 0     # log bytes covered by the index
+        self.loaded = False
+
+        # Optional ChatArchive, grep continues into archived segments
+        self.archive = None
+
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    ''' Building '''
+
+    def _next_mark(self) -> int:
+        # Offset from which the next line starts a new block
+        if not self.entries:
+            return 0
+        return (self.entries[-1][1] // self.block_size + 1) * self.block_size
+
+    def _add_line(self, line: str, offset: int, next_mark: int) -> int:
+        fields = parse_log_line(line)
+        if fields is None:
+            return next_mark
+
+        timestamp, network, location, user, message = fields
+
+        if offset >= next_mark:
+            self.entries.append((timestamp, offset))
+            next_mark = (offset // self.block_size + 1) * self.block_size
+
+        # PM content stays private, only the time is remembered
+        if location == "PM":
+            message = ""
+        entry = (timestamp, location, user, message[:SEEN_MESSAGE_LENGTH])
+
+        # One entry per channel, the bot's channels keep the list short
+        key = _seen_key(user, network)
+        location = location.lower()
+        self.seen[key] = [entry] + [old for old in self.seen.get(key, ()) if old[1].lower() != location]
+        self._dirty = True
+        return next_mark
+
+    def load(self) -> None:
+        """
+        Load saved index and catch up with lines written since the last save.
+        Blocking, run in a thread before the writer opens the log.
+        """
+        try:
+            with open(self.seen_path, encoding="utf-8") as f:
+                saved = json.load(f)
+            self.seen = {nick: _seen_entries(value) for nick, value in saved["seen"].items()}
+            self.offset = int(saved["offset"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log_warning(f"Chat seen table unreadable, rebuilding: {e}")
+            self.seen, self.offset = {}, 0
+
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                for raw in f:
+                    timestamp, _, offset = raw.rstrip("\n").rpartition(" ")
+                    if timestamp and offset.isdecimal() and int(offset) < self.offset:
+                        self.entries.append((timestamp, int(offset)))
+        except FileNotFoundError:
+            pass
+
+        try:
+            log_size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            log_size = 0
+
+        # Log was rotated or truncated, the seen table is still valid
+        if self.offset > log_size:
+            self.entries, self.offset = [], 0
+            self._dirty = True
+
+        if log_size > self.offset:
+            self._scan(log_size)
+
+        self._write_entries()
+        self.loaded = True
+
+    def _scan(self, log_size: int) -> None:
+        # Index complete lines between self.offset and log_size
+        next_mark = self._next_mark()
+        with open(self.log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = self.offset
+            while pos < log_size:
+                end = mm.find(b"\n", pos, log_size)
+                if end < 0:
+                    break
+                line = mm[pos:end].decode("utf-8", errors="replace")
+                next_mark = self._add_line(line, pos, next_mark)
+                pos = end + 1
+            self.offset = pos
+
+    def _write_entries(self) -> None:
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{timestamp} {offset}\n" for timestamp, offset in self.entries)
+
+    async def after_write(self, lines: list[str]) -> None:
+        # Called by the writer with every batch right after it was flushed to the log
+        start = len(self.entries)
+        next_mark = self._next_mark()
+
+        for line in lines:
+            next_mark = self._add_line(line, self.offset, next_mark)
+            self.offset += len(line.encode())
+
+        if len(self.entries) > start:
+            async with aiofiles.open(self.index_path, "a", encoding="utf-8") as f:
+                await f.write("".join(f"{timestamp} {offset}\n" for timestamp, offset in self.entries[start:]))
+
+        if self._dirty and time.monotonic() - self._last_save >= self.save_interval:
+            await self.save()
+
+    async def reset_segment(self) -> None:
+        # Active log was rotated into the archive, offsets start over
+        self.entries = []
+        self.offset = 0
+        self._dirty = True
+        await asyncio.to_thread(self._write_entries)
+        await self.save()
+
+    async def save(self) -> None:
+        # Handed to the shared JSON store, written atomically after its flush delay.
+        # Entry lists are replaced and never changed in place, a shallow copy is a snapshot
+        if not self._dirty:
+            return
+        json_store.set(self.seen_path, {"offset": self.offset, "seen": dict(self.seen)})
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    async def flush(self) -> None:
+        # Save and write now, the chat log writer is stopping
+        await self.save()
+        await json_store.flush(self.seen_path)
+
+    ''' Queries '''
+
+    def last_seen(self, nick: str, network: str = "") -> list[tuple]:
+        # (timestamp, location, user, message) of the last line from nick on network
+        # in every channel (and PM), newest first
+        return self.seen.get(_seen_key(nick, network), [])
+
+    def grep(self, term: str, limit: int, network: str = "", location: str | None = None,
+             skip_users=(), skip_prefix: str | None = None, max_bytes: int = 16 * 1024 * 1024) -> list[tuple]:
+        """
+        Newest log lines whose message contains term (ASCII case-insensitive), newest first.
+        Only lines of network are searched, location limits results to one channel
+        and PM lines are never returned.
+        At most max_bytes of the newest log are searched, the active log first and then
+        archived segments (streamed through gzip). Blocking, run in a thread.
+        """
+        needle = term.lower().encode()
+        if not needle or limit <= 0:
+            return []
+
+        term = term.lower()
+        skip_users = {user.lower() for user in skip_users}
+        location = location.lower() if location else None
+
+        def accept(line: bytes) -> tuple | None:
+            fields = parse_log_line(line.decode("utf-8", errors="replace"))
+            if fields is None:
+                return None
+
+            timestamp, line_network, line_location, user, message = fields
+            if line_network != network or line_location == "PM" or (location and line_location.lower() != location):
+                return None
+            if user.lower() in skip_users or (skip_prefix and message.startswith(skip_prefix)):
+                return None
+
+            # The term may have matched the timestamp, channel or nick
+            if term not in message.lower():
+                return None
+            return timestamp, line_location, user, message
+
+        results = []
+        searched = 0
+
+        if self.offset:
+            searched = self._grep_active(needle, accept, limit, results, max_bytes)
+
+        if self.archive is not None:
+            for segment, path in self.archive.segment_paths():
+                if len(results) >= limit or searched >= max_bytes:
+                    break
+
+                # Keep only the newest matches of the segment while streaming it forward
+                newest = deque(maxlen=limit - len(results))
+                try:
+                    with gzip.open(path, "rb") as f:
+                        for line in f:
+                            if needle in line.lower():
+                                match = accept(line.rstrip(b"\n"))
+                                if match:
+                                    newest.append(match)
+                except FileNotFoundError:
+                    # Removed by retention meanwhile
+                    continue
+
+                results.extend(reversed(newest))
+                searched += segment.get("bytes", 0)
+
+        return results
+
+    def _grep_active(self, needle: bytes, accept, limit: int, results: list, max_bytes: int) -> int:
+        # Search the active log block by block, newest first, returns bytes searched
+        bounds = [offset for _, offset in self.entries] or [0]
+        if bounds[0] != 0:
+            bounds.insert(0, 0)
+        ends = bounds[1:] + [self.offset]
+
+        searched = 0
+        with open(self.log_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start, end in zip(reversed(bounds), reversed(ends)):
+                end = min(end, len(mm))
+                if start >= end:
+                    continue
+
+                block = mm[start:end].lower()
+                pos = len(block)
+
+                while len(results) < limit:
+                    hit = block.rfind(needle, 0, pos)
+                    if hit < 0:
+                        break
+
+                    line_start = block.rfind(b"\n", 0, hit) + 1
+                    line_end = block.find(b"\n", hit)
+                    pos = line_start
+
+                    # Original case from the file, not the lowered copy
+                    match = accept(mm[start + line_start:start + (line_end if line_end >= 0 else len(block))])
+                    if match:
+                        results.append(match)
+
+                searched += end - start
+                if len(results) >= limit or searched >= max_bytes:
+                    break
+
+        return searched
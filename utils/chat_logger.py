@@ -1,21 +1,252 @@
+import asyncio
 import aiofiles
 from datetime import datetime, timezone
-from core.config import LOGS_DIR
+from pathlib import Path
+from core.config import config, LOGS_DIR
+from core.logger import log_error
+from utils.chat_archive import ChatArchive
+from utils.chat_index import ChatIndex, network_field
 from utils.text import sanitize_text
 
 CHAT_LOG_FILE = LOGS_DIR / "chat.log"
 
-async def log_chat(user: str, target: str, message: str):
-    clean_message = sanitize_text(message)
-    
-    # Create timestamp
-    timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+class ChatLogUnavailable(Exception):
+    # Chat log index is disabled or still loading
+    pass
+
+
+class ChatLogSink:
+    """
+    Long-lived chat log writer.
+    Lines are queued in memory and written in batches by one background task,
+    the log file stays open until the segment is rotated into the archive.
+    An optional ChatIndex is updated after every written batch.
+    """
+
+    def __init__(self, path, batch_size: int = 100, flush_interval: float = 1.0,
+                 index: ChatIndex | None = None, archive: ChatArchive | None = None):
+        self.path = Path(path)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.index = index
+        self.archive = archive
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def put(self, line: str) -> None:
+        # Queue line for the writer task, never blocks
+        self._queue.put_nowait(line)
+
+    async def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Stop writer task, remaining lines are flushed before the file is closed
+        if not self.running:
+            return
+
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    def _loaded_index(self) -> ChatIndex:
+        if self.index is None or not self.index.loaded:
+            raise ChatLogUnavailable("Chat log index is not available")
+        return self.index
+
+    async def last_seen(self, nick: str, network: str = "") -> list[tuple]:
+        return self._loaded_index().last_seen(nick, network)
+
+    async def grep(self, term: str, limit: int, **options) -> list[tuple]:
+        # Log is read through mmap in a thread, the event loop keeps running
+        return await asyncio.to_thread(self._loaded_index().grep, term, limit, **options)
+
+    # Collect queued lines until batch is full or flush interval has passed
+    async def _collect(self, first: str) -> tuple[list[str], bool]:
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            try:
+                line = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    line = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            # None is the stop marker
+            if line is None:
+                return batch, True
+
+            batch.append(line)
+
+        return batch, False
+
+    async def _rotate(self, f):
+        # Close the active segment, hand it to the archive and start a new log
+        await f.close()
+        self.archive.rotate(self.path)
+        if self.index:
+            await self.index.reset_segment()
+        return await aiofiles.open(self.path, "a", encoding="utf-8", newline="")
+
+    async def _run(self) -> None:
+        f = None
+        try:
+            # Index has to match the log before anything new is appended
+            if self.index and not self.index.loaded:
+                await asyncio.to_thread(self.index.load)
+                await self.index.save()
+
+            if self.archive:
+                await self.archive.start()
+                await asyncio.to_thread(self.archive.open_segment, self.path)
+
+            # newline="" keeps "\n" as one byte on every OS, the index counts line bytes
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            f = await aiofiles.open(self.path, "a", encoding="utf-8", newline="")
+            size = self.path.stat().st_size
+
+            stopping = False
+            while not stopping:
+                first = await self._queue.get()
+                if first is None:
+                    break
+
+                batch, stopping = await self._collect(first)
+                data = "".join(batch)
+                data_size = len(data.encode())
+
+                if self.archive:
+                    if self.archive.should_rotate(size, data_size):
+                        f = await self._rotate(f)
+                        size = 0
+                    self.archive.note_write()
+
+                # One write and flush per batch
+                await f.write(data)
+                await f.flush()
+                size += data_size
+
+                if self.index:
+                    await self.index.after_write(batch)
+
+            if self.index:
+                await self.index.flush()
+
+        except Exception as e:
+            log_error("Chat log writer stopped: ", exc=e)
+
+        finally:
+            if f is not None:
+                await f.close()
+            if self.archive:
+                await self.archive.stop()
+
+
+_sink = None
+
+
+def _get_sink() -> ChatLogSink:
+    global _sink
+    if _sink is None:
+        logging_cfg = config.get("logging", {})
+
+        index = None
+        if logging_cfg.get("chat_index_enabled", True):
+            index = ChatIndex(
+                CHAT_LOG_FILE,
+                block_size=logging_cfg.get("chat_index_block_size", 65536),
+                save_interval=float(logging_cfg.get("chat_index_save_interval", 60)),
+            )
+
+        archive = None
+        if logging_cfg.get("chat_log_archive_enabled", True):
+            archive = ChatArchive(
+                CHAT_LOG_FILE.parent / "chat_archive",
+                segment_max_bytes=logging_cfg.get("chat_log_segment_max_bytes", 16 * 1024 * 1024),
+                segment_max_age=logging_cfg.get("chat_log_segment_max_age", 86400),
+                retention_days=logging_cfg.get("chat_log_retention_days", 0),
+                retention_max_bytes=logging_cfg.get("chat_log_retention_max_bytes", 0),
+            )
+            if index:
+                index.archive = archive
+
+        _sink = ChatLogSink(
+            CHAT_LOG_FILE,
+            batch_size=logging_cfg.get("chat_log_batch_size", 100),
+            flush_interval=logging_cfg.get("chat_log_flush_interval", 1.0),
+            index=index,
+            archive=archive,
+        )
+    return _sink
+
+
+def use_remote_chat_log(remote) -> None:
+    # Shard workers hand lines and lookups to the coordinator's chat log (core/shards.py)
+    global _sink
+    _sink = remote
+
+
+def write_chat_lines(lines: list[str]) -> None:
+    # Lines already formatted by log_chat in a shard worker
+    sink = _get_sink()
+    for line in lines:
+        sink.put(line)
+
+
+async def chat_last_seen(nick: str, network: str | None = None) -> list[tuple]:
+    # (timestamp, location, user, message) of nick's last line on network (bot.name)
+    # in every channel, newest first, raises ChatLogUnavailable
+    return await _get_sink().last_seen(nick, network_field(network))
+
+
+async def chat_grep(term: str, limit: int, network: str | None = None, **options) -> list[tuple]:
+    # Newest matching lines of network (bot.name), see ChatIndex.grep for options,
+    # raises ChatLogUnavailable
+    return await _get_sink().grep(term, limit, network=network_field(network), **options)
+
+
+async def start_chat_logger() -> None:
+    await _get_sink().start()
+
+
+async def stop_chat_logger() -> None:
+    # Flush pending chat log lines, call on shutdown
+    if _sink is not None:
+        await _sink.stop()
+
+
+async def log_chat(user: str, target: str, message: str, sanitized: bool = False, when: datetime | None = None,
+                   network: str | None = None):
+    # Callers that already sanitized the message pass sanitized=True
+    clean_message = message if sanitized else sanitize_text(message)
+
+    # Create timestamp, when is the server's time of the message if it sent one
+    timestamp = (when.astimezone(timezone.utc) if when else datetime.now(timezone.utc)).strftime("%Y-%m-%d %H:%M:%S")
 
     # Normalize PMs
     location = target if target.startswith("#") else "PM"
 
-    # Build log line
+    # Build log line, bots of [[networks]] add their network after the timestamp
+    if network:
+        location = f"{network_field(network)} | {location}"
     line = f"{timestamp} | {location} | {user} | {clean_message}\n"
 
-    async with aiofiles.open(CHAT_LOG_FILE, "a", encoding="utf-8") as f:
-        await f.write(line)
+    # Start writer on first use
+    sink = _get_sink()
+    if not sink.running:
+        await sink.start()
+
+    sink.put(line)
@@ -0,0 +1,127 @@
+# Rate limiting helpers goes here
+
+import time
+from collections import OrderedDict
+
+
+class TokenBucket:
+    # Classic token bucket, refills "rate" tokens per second up to "burst" tokens
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> int:
+        # Whole tokens that can be spent right now
+        self._refill()
+        return int(self.tokens)
+
+    def consume(self, amount: float = 1) -> bool:
+        # Spend tokens if there are enough, return False otherwise
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    def wait_time(self, amount: float = 1) -> float:
+        # Seconds until "amount" tokens are available
+        self._refill()
+        missing = amount - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float("inf")
+
+
+class KeyedRateLimiter:
+    """
+    One token bucket per key (user, channel, ...).
+    Holds at most max_keys buckets, the least recently used key is dropped first.
+    A dropped key was idle the longest, so its bucket was (nearly) full anyway.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 5000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max(1, int(max_keys))
+        self._buckets = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def bucket(self, key) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def allow(self, key, cost: float = 1) -> bool:
+        return self.bucket(key).consume(cost)
+
+
+class CommandRateLimiter:
+    """
+    Token buckets keyed by user, by channel and by command.
+    A command only runs if all three buckets can pay its cost,
+    nothing is charged when any of them is empty.
+    """
+
+    def __init__(self, user_rate, user_burst, channel_rate, channel_burst,
+                 command_rate, command_burst, max_keys: int = 5000, enabled: bool = True):
+        self.enabled = enabled
+        self.users = KeyedRateLimiter(user_rate, user_burst, max_keys)
+        self.channels = KeyedRateLimiter(channel_rate, channel_burst, max_keys)
+        self.commands = KeyedRateLimiter(command_rate, command_burst, max_keys)
+
+        # Users that already got a cooldown notice, bounded like the buckets
+        self._notified = OrderedDict()
+        self._max_notified = max(1, int(max_keys))
+
+    def check(self, user_key, channel_key, command_key, cost: float = 1) -> tuple[bool, float]:
+        """
+        Returns (allowed, retry_after_seconds).
+        Buckets are charged only when the command is allowed.
+        """
+        if not self.enabled:
+            return True, 0.0
+
+        buckets = (
+            self.users.bucket(user_key),
+            self.channels.bucket(channel_key),
+            self.commands.bucket(command_key),
+        )
+
+        # A cost above a bucket's burst could never be paid, cap it at a full bucket
+        costs = [min(cost, bucket.burst) for bucket in buckets]
+
+        retry_after = max(bucket.wait_time(c) for bucket, c in zip(buckets, costs))
+        if retry_after > 0:
+            return False, retry_after
+
+        for bucket, c in zip(buckets, costs):
+            bucket.consume(c)
+
+        self._notified.pop(user_key, None)
+        return True, 0.0
+
+    def should_notify(self, user_key) -> bool:
+        # True once per cooldown, later over-limit requests are dropped silently
+        if user_key in self._notified:
+            return False
+
+        self._notified[user_key] = True
+        if len(self._notified) > self._max_notified:
+            self._notified.popitem(last=False)
+        return True
@@ -2,17 +2,32 @@
 
 import re
 
-# Text sanitizer function
-def sanitize_text(text: str) -> str:
-    allowed_symbols = set(" .,!?-_:;@#()[]{}")
+# Symbols kept by the sanitizer besides letters and digits
+ALLOWED_SYMBOLS = frozenset(" .,!?-_:;@#()[]{}")
+
 
-    # Remove non-printable characters
-    clean_text = "".join(ch for ch in text if ch.isprintable())
+# Translate table for sanitize_text, filled lazily per code point
+# Keeps printable alphanumeric characters and allowed symbols, deletes everything else
+class _SanitizeTable(dict):
+    # Stop caching new code points past this size (guards against memory growth)
+    max_size = 65536
 
-    # Keep only alphanumeric characters and allowed symbols
-    clean_text = "".join(ch for ch in clean_text if ch.isalnum() or ch in allowed_symbols)
+    def __missing__(self, codepoint):
+        ch = chr(codepoint)
+        keep = ch.isprintable() and (ch.isalnum() or ch in ALLOWED_SYMBOLS)
+        value = codepoint if keep else None
+        if len(self) < self.max_size:
+            self[codepoint] = value
+        return value
 
-    return clean_text.strip()
+
+_SANITIZE_TABLE = _SanitizeTable()
+
+
+# Text sanitizer function
+def sanitize_text(text: str) -> str:
+    # Remove non-printable characters and keep only alphanumeric characters and allowed symbols
+    return text.translate(_SANITIZE_TABLE).strip()
 
 
 # Text truncate function
@@ -20,6 +35,71 @@ def truncate_text(text: str, max_length: int) -> str:
     # Truncate text to a maximum length.
     return text[:max_length]
 
+# Split text into pieces of at most max_bytes UTF-8 bytes
+def split_message(text: str, max_bytes: int) -> list[str]:
+    # Splits on spaces, words longer than max_bytes are cut on a character boundary
+    if len(text) * 4 <= max_bytes or len(text.encode()) <= max_bytes:
+        return [text]
+
+    parts = []
+    current = ""
+    current_size = 0
+
+    for word in text.split():
+        word_size = len(word.encode())
+
+        # Word does not fit on any line, flush and cut it into chunks
+        while word_size > max_bytes:
+            if current:
+                parts.append(current)
+                current, current_size = "", 0
+            chunk = word.encode()[:max_bytes].decode("utf-8", errors="ignore") or word[0]
+            parts.append(chunk)
+            word = word[len(chunk):]
+            word_size = len(word.encode())
+
+        if not word:
+            continue
+
+        if current and current_size + 1 + word_size > max_bytes:
+            parts.append(current)
+            current, current_size = "", 0
+
+        if current:
+            current = f"{current} {word}"
+            current_size += 1 + word_size
+        else:
+            current, current_size = word, word_size
+
+    if current:
+        parts.append(current)
+    return parts
+
+
+# Join short messages into as few pieces of at most max_bytes UTF-8 bytes as possible
+def pack_messages(messages: list[str], max_bytes: int, separator: str = " - ") -> list[str]:
+    # Order is kept, messages longer than max_bytes are split first
+    separator_size = len(separator.encode())
+    packed = []
+    current = None
+    current_size = 0
+
+    for message in messages:
+        for part in split_message(message, max_bytes):
+            part_size = len(part.encode())
+            if current is not None and current_size + separator_size + part_size <= max_bytes:
+                current = f"{current}{separator}{part}"
+                current_size += separator_size + part_size
+            else:
+                if current is not None:
+                    packed.append(current)
+                current, current_size = part, part_size
+
+    if current is not None:
+        packed.append(current)
+    return packed
+
+
 # Sanitize filename
 def sanitize_filename(name: str) -> str:
     name = name.strip().lower()